@@ -2,6 +2,7 @@ import gi
 gi.require_version('Gst', '1.0')
 from gi.repository import Gst, GLib
 import os
+import sys
 import argparse
 import multiprocessing
 import numpy as np
@@ -21,10 +22,18 @@ from hailo_rpi_common import (
     get_numpy_from_buffer,
     GStreamerApp,
     app_callback_class,
+    callback_worker,
     dummy_callback,
-    jpg_buffer
+    get_viewer_count,
+    frame_buffer
 )
 
+# DetectionBatch is shared with Warehouse_Monitoring
+WAREHOUSE_MONITORING = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Warehouse_Monitoring')
+if WAREHOUSE_MONITORING not in sys.path:
+    sys.path.append(WAREHOUSE_MONITORING)
+from detections import DetectionBatch
+
 
 
 import paho.mqtt.client as mqtt
@@ -66,13 +75,17 @@ class user_app_callback_class(app_callback_class):
     def __init__(self):
         super().__init__()
         self.new_variable = 42  # New variable example
+        # Drawing, encoding and MQTT publishing happen here, off the streaming thread
+        self.worker = callback_worker(process_detections)
 
     # def new_function(self):  # New function example
     #     return "The meaning of life is: "
 
 # This is the callback function that will be called when data is available from the pipeline
+# It runs on the streaming thread, so it only copies out the detections and, when
+# someone is watching, the frame. The rest runs on user_data.worker
 def app_callback(pad, info, user_data):
-    global initial_timestamp
+    start_time = time.perf_counter()
     # Get the GstBuffer from the probe info
     buffer = info.get_buffer()
     # Check if the buffer is valid
@@ -81,102 +94,80 @@ def app_callback(pad, info, user_data):
 
     # Using the user_data to count the number of frames
     user_data.increment()
-    string_to_print = f"Frame count: {user_data.get_count()}\n"
 
     # Get the caps from the pad
     format, width, height = get_caps_from_pad(pad)
 
+    # Get the detections from the buffer
+    roi = hailo.get_roi_from_buffer(buffer)
+    boxes, confidences, labels = [], [], []
+    for detection in roi.get_objects_typed(hailo.HAILO_DETECTION):
+        bbox = detection.get_bbox()
+        boxes.append((bbox.xmin(), bbox.ymin(), bbox.xmax(), bbox.ymax()))
+        confidences.append(detection.get_confidence())
+        labels.append(detection.get_label())
+
     # If the user_data.use_frame is set to True, we can get the video frame from the buffer
+    # The copy is made here, downstream elements draw on the buffer once the probe returns.
+    # Without viewers nothing is copied, drawn or encoded, counting and MQTT carry on
     frame = None
-    if user_data.use_frame and format is not None and width is not None and height is not None:
+    if get_viewer_count() > 0 and user_data.use_frame and format is not None and width is not None and height is not None:
         # Get video frame
         frame = get_numpy_from_buffer(buffer, format, width, height)
 
-    # Get the detections from the buffer
-    roi = hailo.get_roi_from_buffer(buffer)
-    detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
-
-    # Parse the detections
-    Coco_number = 0
-    milk_number = 0
-    chips_number = 0
-    crackers_number = 0
-    popcorn_number = 0
-    crisps_number = 0
-    
-    for detection in detections:
-        label = detection.get_label()
-        bbox = detection.get_bbox()
-        confidence = detection.get_confidence()
-        
-        x_min, y_min, x_max, y_max = bbox.xmin(), bbox.ymin(), bbox.xmax(), bbox.ymax()
-        
-        xmin = int(x_min * width)
-        ymin = int(y_min * height)
-        xmax = int(x_max * width)
-        ymax = int(y_max * height)
-        
-        text = f"{label}: {confidence:.2f}"
+    user_data.worker.submit((frame, width, height, boxes, confidences, labels))
+    user_data.record_probe(time.perf_counter() - start_time)
+    return Gst.PadProbeReturn.OK
+
+# Runs on the worker thread for every frame the probe handed over
+def process_detections(item):
+    global initial_timestamp
+    frame, width, height, boxes, confidences, labels = item
+
+    # Parse the detections into one array-backed batch, scaled to pixels
+    batch = DetectionBatch.fromNames(boxes, confidences, labels).scale(width, height)
+    counts = batch.countByLabel()
+
+    if frame is not None:
+        for (xmin, ymin, xmax, ymax), label, confidence in zip(
+            batch.getPixelBoxes(), batch.getLabelNames(), batch.scores.tolist()
+        ):
+            text = f"{label}: {confidence:.2f}"
         
-        if label == "Coco":
-            Coco_number  += 1
-        if label == "milk":
-            milk_number += 1
-        if label =="chips":
-            chips_number += 1
-        if label =="crackers":
-            crackers_number += 1
-        if label =="popcorn":
-            popcorn_number += 1
-        if label =="crisps":
-            crisps_number += 1
-            
-        color = label_colors.get(label, tuple(random.randint(0, 255) for _ in range(3)))
+            color = label_colors.get(label, tuple(random.randint(0, 255) for _ in range(3)))
         
-        # Draw the bounding box on the frame
-        cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), color, 2)
+            # Draw the bounding box on the frame
+            cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), color, 2)
         
-        text_size = cv2.getTextSize(text,cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
-        text_x = xmin
-        text_y = ymin - 10 if ymin - 10 > 10 else ymin + 10
+            text_size = cv2.getTextSize(text,cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
+            text_x = xmin
+            text_y = ymin - 10 if ymin - 10 > 10 else ymin + 10
         
-        # Background rectangle for the text to be readable
-        cv2.rectangle(frame, (text_x, text_y - text_size[1]), (text_x + text_size[0], text_y + 5), color, -1)
+            # Background rectangle for the text to be readable
+            cv2.rectangle(frame, (text_x, text_y - text_size[1]), (text_x + text_size[0], text_y + 5), color, -1)
         
-        # Draw the text
-        cv2.putText(frame, text, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+            # Draw the text
+            cv2.putText(frame, text, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
     
-    frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
    
-    _, buffer = cv2.imencode('.jpg', frame)
-    frame = buffer.tobytes()
+        _, buffer = cv2.imencode('.jpg', frame)
+        frame = buffer.tobytes()
+        frame_buffer.setData(frame)
+
     # 定义当前时间戳
     current_timestamp = time.time()
     # 判断时间差是否大于1秒
     if current_timestamp - initial_timestamp > 1:
-        print("大于1s,publish")
-        data = {
-            "Coco_number" : Coco_number,
-            "milk_number" : milk_number,
-            "chips_number" : chips_number,
-            "crackers_number" : crackers_number,
-            "popcorn_number" : popcorn_number,
-            "crisps_number" : crisps_number,
-           }
+        data = {f"{label}_number": counts.get(label, 0) for label in label_colors}
 
         payload = json.dumps(data)
         client.publish(topic, payload)
 
         # 更新初始时间戳为当前时间戳
         initial_timestamp = current_timestamp
-    else:
-        print("小于1s")        
- 
-    jpg_buffer.put(frame)
     
     # print("callback ok")
-    
-    return Gst.PadProbeReturn.OK
 
             
 def SEND_PIPELINE(ip='127.0.0.1', port=5000, name='send'):
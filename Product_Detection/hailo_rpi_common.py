@@ -12,13 +12,30 @@ import time
 import signal
 import queue
 import threading
+import collections
+import json
+import logging
 
 
 from flask import Flask, render_template, Response
 
+# The streaming server and frame buffer are shared with Warehouse_Monitoring
+WAREHOUSE_MONITORING = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Warehouse_Monitoring')
+if WAREHOUSE_MONITORING not in sys.path:
+    sys.path.append(WAREHOUSE_MONITORING)
+from buffer import Buffer
+from streamer import StreamServer
+
 app = Flask(__name__)
 
-jpg_buffer = multiprocessing.Queue()
+# Latest JPEG only, every viewer of either server reads the same one
+frame_buffer = Buffer()
+
+# Set by run_stream_server, it counts its own viewers
+stream_server = None
+
+# Set by GStreamerApp, served as JSON at /stats
+callback_data = None
 
 # Try to import hailo python module
 try:
@@ -41,6 +58,9 @@ class app_callback_class:
         self.use_frame = False
         self.frame_queue = multiprocessing.Queue(maxsize=3)
         self.running = True
+        # Last probe execution times in seconds
+        self.probe_times = collections.deque(maxlen=1000)
+        self.worker = None
 
     def increment(self):
         self.frame_count += 1
@@ -48,6 +68,28 @@ class app_callback_class:
     def get_count(self):
         return self.frame_count
 
+    def record_probe(self, seconds):
+        self.probe_times.append(seconds)
+
+    def get_stats(self):
+        """
+        Returns the frame count, the probe execution time and the worker queue.
+
+        Returns:
+            dict: Probe times are in microseconds over the last 1000 frames.
+        """
+        times = np.array(self.probe_times) * 1e6
+        stats = {"frames": self.frame_count}
+        if len(times) > 0:
+            stats["probe_us"] = {
+                "mean": round(float(times.mean()), 1),
+                "p99": round(float(np.percentile(times, 99)), 1),
+                "max": round(float(times.max()), 1),
+            }
+        if self.worker is not None:
+            stats["worker"] = self.worker.get_stats()
+        return stats
+
     def set_frame(self, frame):
         if not self.frame_queue.full():
             self.frame_queue.put(frame)
@@ -58,6 +100,53 @@ class app_callback_class:
         else:
             return None
 
+class callback_worker:
+    """
+    Runs the slow part of a pad probe callback on its own thread.
+
+    The probe only hands over what it pulled from the buffer. The queue is bounded,
+    when the worker falls behind the oldest item is dropped so the streaming thread
+    never waits.
+    """
+    def __init__(self, handler, max_size=4):
+        self.handler = handler
+        self.items = collections.deque(maxlen=max_size)
+        self.condition = threading.Condition()
+        self.processed = 0
+        self.dropped = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='callback-worker', daemon=True)
+        self.thread.start()
+
+    def submit(self, item):
+        with self.condition:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: len(self.items) > 0 or not self.running)
+                if not self.running:
+                    return
+                item = self.items.popleft()
+            try:
+                self.handler(item)
+            except Exception as error:
+                print(f"Callback worker error: {error}")
+            self.processed += 1
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join(timeout=1)
+
+    def get_stats(self):
+        return {"queued": len(self.items), "processed": self.processed, "dropped": self.dropped}
+
 def dummy_callback(pad, info, user_data):
     """
     A minimal dummy callback function that returns immediately.
@@ -113,6 +202,12 @@ def get_default_parser():
         help="Disables display sink sync, will run as fast as possible. Relevant when using file source."
     )
     parser.add_argument("--dump-dot", action="store_true", help="Dump the pipeline graph to a dot file pipeline.dot")
+    parser.add_argument(
+        "--http-server", type=str, choices=["asyncio", "flask"], default="flask",
+        help="flask uses a thread per viewer, asyncio serves all viewers from one thread and \
+        skips frames for slow ones. Defaults to flask"
+    )
+    parser.add_argument("--max-viewers", type=int, default=20, help="Concurrent viewers with the asyncio server, defaults to 20")
     return parser
 
 #---------------------------------------------------------
@@ -329,31 +424,73 @@ def USER_CALLBACK_PIPELINE(name='identity_callback'):
 
     return user_callback_pipeline
 
+def get_viewer_count():
+    """Returns how many browsers watching /video_feed are ready for a new frame.
+
+    The callback only draws and encodes frames while this is above 0. Viewers still
+    busy with an earlier frame do not count, so frames are encoded at most as fast as
+    the fastest viewer takes them.
+    """
+    if stream_server is not None:
+        return stream_server.getReadyClients('/video_feed')
+    # A Flask viewer waiting on the buffer has sent every frame so far
+    return frame_buffer.getWaiting()
+
 def http_send():
+    sequence = frame_buffer.getSequence()
     while True:
-        if not jpg_buffer.empty():
-            frame = jpg_buffer.get()
-            print('Sending buffer data')
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-        else:
-            # 如果队列为空，稍微等待一下再继续
-            time.sleep(0.01)
+        # 等待新的一帧，跟不上的浏览器直接跳到最新一帧
+        latest_sequence, frame = frame_buffer.waitData(sequence, timeout=5)
+        if latest_sequence == sequence:
+            continue
+        sequence = latest_sequence
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
         
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/stats')
+def stats():
+    return Response(get_stats_json(), mimetype='application/json')
+
 @app.route('/video_feed')
 def video_feed():
     return Response(http_send(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 
+def get_stats_json():
+    return json.dumps(callback_data.get_stats() if callback_data is not None else {})
+
 def run_flask():
     """启动 Flask 应用"""
     print('run flask')
     app.run(host='0.0.0.0', port=2000)
 
+
+def run_stream_server(max_viewers=20):
+    """Starts the asyncio stream server in place of Flask.
+
+    Args:
+        max_viewers (int): Concurrent /video_feed viewers, more get a 503.
+
+    Returns:
+        StreamServer: The running server.
+    """
+    global stream_server
+    print('run stream server')
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'index.html'), 'rb') as file:
+        index_page = file.read().replace(b"{{ url_for('video_feed') }}", b'/video_feed')
+
+    server = StreamServer('0.0.0.0', 2000, maxClients=max_viewers, logger=logging.getLogger(__name__))
+    server.addStream('/video_feed', frame_buffer)
+    server.addRoute('/', 'text/html; charset=utf-8', lambda: index_page)
+    server.addRoute('/stats', 'application/json', lambda: get_stats_json().encode())
+    server.start()
+    stream_server = server
+    return server
+
 # -----------------------------------------------------------------------------------------------
 # GStreamerApp class
 # -----------------------------------------------------------------------------------------------
@@ -392,6 +529,8 @@ class GStreamerApp:
 
         # Set user data parameters
         user_data.use_frame = self.options_menu.use_frame
+        global callback_data
+        callback_data = user_data
 
         self.sync = "false" if (self.options_menu.disable_sync or self.source_type != "file") else "true"
         # self.show_fps = "true" if self.options_menu.show_fps else "false"
@@ -463,6 +602,8 @@ class GStreamerApp:
         GLib.usleep(100000)  # 0.1 second delay
 
         self.pipeline.set_state(Gst.State.NULL)
+        if self.user_data.worker is not None:
+            self.user_data.worker.stop()
         GLib.idle_add(self.loop.quit)
 
 
@@ -521,13 +662,16 @@ class GStreamerApp:
         # Run the GLib event loop
         
         loop_process = threading.Thread(target=self.start_loop_in_thread)
-        http_process = threading.Thread(target=run_flask)
-        
+
         # loop_process = multiprocessing.Process(target=self.start_loop_in_thread)
         # http_process = multiprocessing.Process(target=run_flask)
-        
+
         loop_process.start()
-        http_process.start()
+        if self.options_menu.http_server == "asyncio":
+            self.stream_server = run_stream_server(self.options_menu.max_viewers)
+        else:
+            http_process = threading.Thread(target=run_flask)
+            http_process.start()
         
 
         # Clean up
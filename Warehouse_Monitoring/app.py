@@ -1,27 +1,49 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from base64 import b64encode
-from json import dumps
 from logging import DEBUG, INFO, Logger, StreamHandler
 from signal import SIGINT, SIGTERM, signal
 from threading import Thread
-from time import localtime, strftime, time, sleep
-from typing import Generator
+from time import perf_counter, sleep
+from typing import Any, Callable, Dict, Generator, List, Optional, Union
 from colorlog import ColoredFormatter
-from cv2 import imencode
 from flask import Flask, Response
-from arguments import Arguments
+from arguments import MODEL_ACCURACY, MODEL_PATHS, Arguments
 from buffer import Buffer
-from detector import Detector
+from controller import RateController
+from detector import Detector, DetectorPool
+from metrics import Gauge, Metrics
+from monitor import Monitor
+from motion import MotionGate
+from pipeline import Pipeline
 from publisher import Publisher
-from video import Video
+from recorder import ClipRecorder
+from selector import ModelSelector
+from streamer import StreamServer
+from tiles import TileDetector
+from tracker import Tracker
+from video import SyntheticVideo, Video, getSourceName
+from workers import ProcessDetector
+from zones import ZoneDetector, loadZones
 
 
-def handleInterrupt(publisher: Publisher, video: Video, logger: Logger) -> None:
+def handleInterrupt(
+    publisher: Publisher,
+    videos: List[Video],
+    pipelines: List[Pipeline],
+    recorders: List[ClipRecorder],
+    detector: Union[Detector, DetectorPool, ProcessDetector],
+    logger: Logger,
+) -> None:
     logger.info("exit signal received, releasing capture device...")
+    for pipeline in pipelines:
+        pipeline.stop()
+    for recorder in recorders:
+        recorder.close()
     publisher.disconnect()
-    video.close()
+    for video in videos:
+        video.close()
+    detector.close()
     exit(0)
 
 
@@ -39,47 +61,243 @@ def setupLogger(level=INFO) -> Logger:
     return logger
 
 
-def handleHttpRequest(data: Buffer) -> Generator[bytes, None, None]:
-    while (True):
-        sleep(0.1)
-        yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + data.getData() + b'\r\n')
+def handleHttpRequest(data: Buffer, clients: Gauge) -> Generator[bytes, None, None]:
+    sequence = 0
+    clients.inc()
+    try:
+        while (True):
+            latestSequence, image = data.waitData(sequence, timeout=5)
+            if latestSequence == sequence:
+                continue
+            sequence = latestSequence
+            yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + image + b'\r\n')
+    finally:
+        # Runs when the client disconnects and the generator is closed
+        clients.dec()
+
 
+def handleSnapshotRequest(snapshot: Callable[[], Optional[bytes]]) -> Response:
+    image = snapshot()
+    if image is None:
+        # Nothing captured yet
+        return Response(status=404)
+    return Response(response=image, mimetype="image/jpeg")
 
-def setupWebServer(data: Buffer, addr: str, port: int, path: str) -> None:
+
+def setupWebServer(
+    streams: Dict[str, Buffer],
+    snapshots: Dict[str, Callable[[], Optional[bytes]]],
+    metrics: Metrics,
+    addr: str,
+    port: int,
+) -> None:
     app = Flask(__name__)
 
-    @app.route(path, methods=['GET'])
-    def _():
-        return Response(
-            response=handleHttpRequest(data),
-            mimetype='multipart/x-mixed-replace; boundary=frame',
+    for path, data in streams.items():
+        clients = metrics.gauge(
+            "warehouse_mjpeg_clients",
+            "Connected MJPEG stream clients",
+            {"path": path},
+        )
+        app.add_url_rule(
+            path,
+            endpoint=path,
+            view_func=lambda data=data, clients=clients: Response(
+                response=handleHttpRequest(data, clients),
+                mimetype='multipart/x-mixed-replace; boundary=frame',
+            ),
+            methods=['GET'],
         )
+    for path, snapshot in snapshots.items():
+        app.add_url_rule(
+            path,
+            endpoint=path,
+            view_func=lambda snapshot=snapshot: handleSnapshotRequest(snapshot),
+            methods=['GET'],
+        )
+    app.add_url_rule(
+        "/metrics",
+        endpoint="metrics",
+        view_func=lambda: Response(
+            response=metrics.render(),
+            mimetype="text/plain; version=0.0.4",
+        ),
+        methods=['GET'],
+    )
     app.run(host=addr, port=port, threaded=True, debug=False)
 
 
+def setupStreamServer(
+    streams: Dict[str, Buffer],
+    snapshots: Dict[str, Callable[[], Optional[bytes]]],
+    metrics: Metrics,
+    addr: str,
+    port: int,
+    maxViewers: int,
+    logger: Logger,
+) -> StreamServer:
+    server = StreamServer(addr, port, maxClients=maxViewers, logger=logger)
+    for path, data in streams.items():
+        server.addStream(path, data)
+        metrics.gauge(
+            "warehouse_mjpeg_clients",
+            "Connected MJPEG stream clients",
+            {"path": path},
+            function=lambda path=path: server.getClients(path),
+        )
+    for path, snapshot in snapshots.items():
+        server.addRoute(path, "image/jpeg", snapshot)
+    server.addRoute(
+        "/metrics",
+        "text/plain; version=0.0.4",
+        lambda: metrics.render().encode(),
+    )
+    server.start()
+    return server
+
+
+def sampleFrames(video: Video, frames: List[Any], count: int, deadline: float) -> None:
+    # A read on a stalled camera blocks only this thread, the capture is
+    # released here once it returns and never from another thread
+    while len(frames) < count:
+        timeout = deadline - perf_counter()
+        frame = video.capture(timeout=timeout) if timeout > 0 else None
+        if frame is None:
+            break
+        frames.append(frame)
+    video.close()
+
+
+def selectModel(args: Arguments, device: str, width: int, height: int, logger: Logger) -> str:
+    # Measured on what the camera really shows, a camera that does not
+    # deliver within a few seconds is replaced by synthetic frames
+    video = Video(device, width, height, fourcc=args.getFourcc(), fps=args.getCaptureFps())
+    sampled: List[Any] = []
+    sampler = Thread(
+        target=sampleFrames,
+        args=(video, sampled, 10, perf_counter() + 10),
+        name="model-sample",
+        daemon=True,
+    )
+    sampler.start()
+    sampler.join(timeout=11)
+    frames = list(sampled)
+    if len(frames) == 0:
+        logger.warning(f"no frames from {getSourceName(device)}, benchmarking on synthetic frames")
+        synthetic = SyntheticVideo(width, height, count=10)
+        frames = [synthetic.capture() for _ in range(10)]
+
+    selector = ModelSelector(
+        MODEL_PATHS, MODEL_ACCURACY, args.getModelCache(), args.getScoreThreshold(),
+    )
+    modelIndex = selector.select(frames, args.getAutoFps())
+    for index, result in selector.getResults().items():
+        if "error" in result:
+            logger.debug(f"model {index} ({result['path']}) not usable: {result['error']}")
+        else:
+            logger.debug(
+                f"model {index} ({result['path']}): {result['fps']:.1f} fps"
+                + (" (cached)" if result["cached"] else "")
+            )
+    if modelIndex is None:
+        raise RuntimeError("no usable model found for --model auto")
+    if selector.getResults()[modelIndex]["fps"] < args.getAutoFps():
+        logger.warning(f"no model reaches {args.getAutoFps()} fps, using the fastest one")
+    logger.info(f"selected model {modelIndex} for {args.getAutoFps()} fps")
+    return MODEL_PATHS[modelIndex]
+
+
+def runMonitor(monitor: Monitor, logger: Logger) -> None:
+    while True:
+        try:
+            processed = monitor.process()
+        except Exception:
+            # One bad frame must not stop the camera for good
+            logger.exception(f"processing a frame of {monitor.getName()} failed")
+            continue
+        if not processed:
+            # The source reconnects by itself, this only happens once it is closed
+            logger.warning(f"capture device {monitor.getName()} is closed")
+            break
+
+
+def formatStats(pipelineStats: List[Dict[str, Any]], monitorStats: Dict[str, Any]) -> str:
+    parts = [
+        f"{stage['name']}: {stage['processed']} frames, {stage['busy']:.1f}s busy"
+        + (
+            f", queue {stage['depth']}/{stage['capacity']}, {stage['dropped']} dropped"
+            if "depth" in stage else ""
+        )
+        + (f", {stage['errors']} errors" if stage["errors"] else "")
+        for stage in pipelineStats
+    ]
+    if "video" in monitorStats:
+        video = monitorStats["video"]
+        parts.append(
+            f"video: {video['backend']}"
+            + (
+                f" {video['fourcc']} {video['width']}x{video['height']}@{video['fps']}"
+                if "fourcc" in video else ""
+            )
+            + f", {video['dropped']} dropped, {video['reconnects']} reconnects"
+        )
+    if "inference" in monitorStats:
+        inference = monitorStats["inference"]
+        parts.append(
+            f"inference: {inference['executed']} executed, {inference['skipped']} skipped"
+        )
+    if monitorStats.get("controller"):
+        point = monitorStats["controller"]
+        parts.append(
+            f"controller: {point['fps']:.1f} fps"
+            + (f" (paced at {point['pacing']:.1f})" if point["pacing"] > 0 else "")
+            + f", {point['cpu']:.0f}% cpu, quality {point['quality']}"
+            + f", detect every {point['detectInterval']} frame(s), "
+            + ", ".join(f"{stage} {value:.1f}ms" for stage, value in point["latency"].items())
+        )
+    if "recorder" in monitorStats:
+        recorder = monitorStats["recorder"]
+        parts.append(
+            f"recorder: {recorder['clips']} clips"
+            + (" (recording)" if recorder["recording"] else "")
+            + f", {recorder['dropped']} frames dropped, {recorder['errors']} errors"
+        )
+    if "frames" in monitorStats:
+        frames = monitorStats["frames"]
+        parts.append(f"frames: {frames['detected']} detected, {frames['predicted']} predicted")
+    return ", ".join(parts)
+
+
 def main() -> None:
     # Read options from command line
     args = Arguments()
-    description = args.getDescription()
-    capDevice = args.getCaptureDevice()
+    cameras = args.getCameras()
     capWidth = args.getVideoWidth()
     capHeight = args.getVideoHeight()
     modelPath = args.getModelPath()
     scoreThreshold = args.getScoreThreshold()
     mqttServer = args.getMqttHost()
     mqttPort = args.getMqttPort()
-    mqttTopic = args.getMqttTopic()
+    publishMode = args.getPublishMode()
 
     # Setup logger
     logger = setupLogger(DEBUG if args.getDebug() else INFO)
     logger.info("loaded arguments from command line")
-    logger.debug(f"current device for capturing: {capDevice}")
+    for camera in cameras:
+        logger.debug(f"current device for capturing: {getSourceName(camera.getCaptureDevice())}")
+        logger.debug(f"messages will be published to: {camera.getMqttTopic()}")
+        if publishMode == "split":
+            logger.debug(f"snapshots will be published to: {camera.getMqttImageTopic()}")
+        if args.getEvents():
+            logger.debug(f"events will be published to: {camera.getMqttEventTopic()}")
+        logger.debug(f"video stream will be served at: {camera.getHttpPath()}")
     logger.debug(f"width for video capturing: {capWidth}")
     logger.debug(f"height for video capturing: {capHeight}")
     logger.debug(f"score threshold is set to: {scoreThreshold}")
+    if args.getModelAuto():
+        modelPath = selectModel(args, cameras[0].getCaptureDevice(), capWidth, capHeight, logger)
     logger.debug(f"path to .tflite model: {modelPath}")
     logger.debug(f"MQTT server is set to: {mqttServer}:{mqttPort}")
-    logger.debug(f"messages will be published to: {mqttTopic}")
 
     # Connect to MQTT server
     publisher = Publisher(mqttServer, mqttPort)
@@ -88,95 +306,310 @@ def main() -> None:
             f"connected to MQTT server: {mqttServer}:{mqttPort}"
         ),
     )
+    publisher.setOnDisconnectCallback(
+        lambda __client__, __userdata__, rc: logger.warning(
+            f"disconnected from MQTT server: {mqttServer}:{mqttPort} ({rc})"
+        ) if rc != 0 else None,
+    )
+    if args.getSpoolDir():
+        # Messages that carry the images are dropped first when the spool fills up
+        publisher.enableSpool(
+            args.getSpoolDir(),
+            round(args.getSpoolSize() * 1024 * 1024),
+            round(args.getSpoolMemory() * 1024 * 1024),
+            [
+                camera.getMqttImageTopic() if publishMode == "split" else camera.getMqttTopic()
+                for camera in cameras
+            ],
+        )
+        logger.debug(
+            f"MQTT messages are spooled to {args.getSpoolDir()} while the server is unreachable"
+        )
     mqttClient = publisher.connect(60)
 
-    # Create object detector
-    detector = Detector(modelPath, scoreThreshold)
-    video = Video(capDevice, capWidth, capHeight)
+    # Create object detector, cameras share a pool of model instances
+    detector: Union[Detector, DetectorPool, ProcessDetector]
+    if args.getInferenceProcesses() > 0:
+        detector = ProcessDetector(modelPath, scoreThreshold, args.getInferenceProcesses(), logger)
+        logger.debug(f"{detector.getSize()} inference process(es) shared by {len(cameras)} camera(s)")
+    elif len(cameras) > 1 or args.getDetectorPool() > 1:
+        detector = DetectorPool(modelPath, scoreThreshold, args.getDetectorPool())
+        logger.debug(f"{detector.getSize()} detector(s) shared by {len(cameras)} camera(s)")
+    else:
+        detector = Detector(modelPath, scoreThreshold)
+
+    # The sequential loop keeps one frame in flight, further detectors only
+    # get work from the pipeline's inference stage
+    pipelined = args.getPipeline() or detector.getSize() > 1
+    if pipelined and not args.getPipeline():
+        logger.info(f"pipeline enabled to keep {detector.getSize()} detectors busy")
+
+    metrics = Metrics()
+    metrics.gauge(
+        "warehouse_detector_info",
+        "Detector model in use",
+        {
+            "model": modelPath,
+            "backend": type(detector).__name__,
+            "instances": str(detector.getSize()),
+        },
+    ).inc()
+    if isinstance(detector, ProcessDetector):
+        metrics.counter(
+            "warehouse_inference_worker_restarts_total",
+            "Inference processes that died and were started again",
+            function=lambda: detector.getStats()["restarts"],
+        )
+        metrics.counter(
+            "warehouse_inference_failures_total",
+            "Frames whose inference failed and were taken as empty",
+            function=lambda: detector.getStats()["failures"],
+        )
+    if args.getSpoolDir():
+        metrics.gauge(
+            "warehouse_mqtt_spool_bytes",
+            "MQTT payload waiting on disk for the server",
+            function=lambda: publisher.getStats()["spooled"],
+        )
+        metrics.counter(
+            "warehouse_mqtt_spool_dropped_bytes_total",
+            "MQTT payload dropped because the spool was full",
+            function=lambda: publisher.getStats()["dropped"],
+        )
+        metrics.gauge(
+            "warehouse_mqtt_connected",
+            "Whether the MQTT server is connected",
+            function=lambda: int(publisher.getStats()["connected"]),
+        )
+
+    monitors: List[Monitor] = []
+    videos: List[Video] = []
+    pipelines: List[Pipeline] = []
+    recorders: List[ClipRecorder] = []
+    streams: Dict[str, Buffer] = {}
+    snapshots: Dict[str, Callable[[], Optional[bytes]]] = {}
+    monitorOf: Dict[str, Monitor] = {}
+    for camera in cameras:
+        video = Video(
+            camera.getCaptureDevice(), capWidth, capHeight,
+            fourcc=args.getFourcc(), fps=args.getCaptureFps(),
+        )
+        name = getSourceName(camera.getCaptureDevice())
+        if video.isOpened():
+            logger.debug(f"camera {name} opened: {video.getStats()}")
+        else:
+            logger.warning(f"could not open camera {name}, will keep retrying")
+        bufferData = Buffer()  # buffer to hold image data
+        monitor = Monitor(
+            video, detector, bufferData, publisher if args.getSpoolDir() else mqttClient,
+            camera.getDescription(),
+            capWidth, capHeight, camera.getMqttTopic(), camera.getMqttImageTopic(),
+            publishMode,
+        )
+        monitor.setName(name)
+        monitor.setMetrics(metrics)
+        monitor.setRenditions(args.getStreamHeight(), args.getMqttImageHeight())
+        metrics.counter(
+            "warehouse_frames_dropped_total",
+            "Frames lost before they were published",
+            {"camera": name, "reason": "source"},
+            function=lambda video=video: video.getStats()["dropped"],
+        )
+        metrics.counter(
+            "warehouse_source_reconnects_total",
+            "Times the video source had to be reopened",
+            {"camera": name},
+            function=lambda video=video: video.getStats()["reconnects"],
+        )
+        if args.getMotionGate():
+            monitor.setMotionGate(MotionGate(
+                args.getMotionThreshold(),
+                args.getMotionDownscale(),
+                args.getMotionMaxSkip(),
+            ))
+        if camera.getZonesPath():
+            zones = loadZones(camera.getZonesPath())
+            monitor.setZones(ZoneDetector(detector, zones, args.getZoneMaxSize()))
+            logger.debug(
+                f"camera {name} watches zones: "
+                f"{', '.join(zone.getId() for zone in zones)}"
+            )
+        if args.getTiles() != (0, 0):
+            if camera.getZonesPath():
+                logger.warning(f"camera {name} has zones, --tiles is not used for it")
+            monitor.setTiles(TileDetector(
+                detector,
+                *args.getTiles(),
+                overlap=args.getTileOverlap(),
+                region=args.getTileRegion(),
+                threshold=args.getTileMergeThreshold(),
+            ))
+        if args.getEvents() or args.getDetectInterval() > 1:
+            monitor.setTracker(Tracker(
+                iouThreshold=args.getTrackIou(),
+                maxMisses=args.getTrackMaxMisses(),
+                dwellTime=args.getDwellTime(),
+            ))
+        if args.getEvents():
+            monitor.setEvents(camera.getMqttEventTopic(), args.getHeartbeatInterval())
+        if args.getDetectInterval() > 1:
+            monitor.setDetectInterval(
+                args.getDetectInterval(),
+                args.getRedetectScore(),
+                args.getRedetectOnChange(),
+            )
+        if args.getClipDir():
+            recorder = ClipRecorder(
+                args.getClipDir(),
+                name,
+                preRoll=args.getClipPreRoll(),
+                postRoll=args.getClipPostRoll(),
+                maxLength=args.getClipMaxLength(),
+                maxMemory=args.getClipMemory(),
+                diskQuota=args.getClipQuota(),
+            )
+            monitor.setRecorder(recorder)
+            recorders.append(recorder)
+        if args.getTargetFps() > 0 or args.getCpuBudget() > 0:
+            monitor.setController(RateController(
+                args.getTargetFps(),
+                args.getCpuBudget(),
+                minQuality=args.getMinJpegQuality(),
+                maxDetectInterval=args.getMaxDetectInterval(),
+                pipelined=pipelined,
+            ))
+        videos.append(video)
+        monitors.append(monitor)
+        streams[camera.getHttpPath()] = bufferData
+        snapshots[camera.getSnapshotPath()] = monitor.getSnapshot
+        monitorOf[camera.getHttpPath()] = monitor
+
+    if args.getMotionGate():
+        logger.debug(
+            f"motion gate threshold: {args.getMotionThreshold()}, "
+            f"downscale: {args.getMotionDownscale()}, max skip: {args.getMotionMaxSkip()}"
+        )
+    if args.getTiles() != (0, 0):
+        logger.debug(
+            f"tiled inference on a {args.getTiles()[0]}x{args.getTiles()[1]} grid, "
+            f"overlap: {args.getTileOverlap()}, region: {args.getTileRegion() or 'whole frame'}"
+        )
+    if args.getDetectInterval() > 1:
+        logger.debug(
+            f"detection every {args.getDetectInterval()} frames, "
+            f"re-detect below score: {args.getRedetectScore()}, "
+            f"on count change: {args.getRedetectOnChange()}"
+        )
+    if args.getTargetFps() > 0 or args.getCpuBudget() > 0:
+        logger.debug(
+            f"rate controller target fps: {args.getTargetFps()}, cpu budget: {args.getCpuBudget()}%, "
+            f"min JPEG quality: {args.getMinJpegQuality()}, "
+            f"max detect interval: {args.getMaxDetectInterval()}"
+        )
+    if args.getStreamHeight() > 0 or args.getMqttImageHeight() > 0:
+        logger.debug(
+            f"stream height: {args.getStreamHeight() or capHeight}, "
+            f"MQTT snapshot height: {args.getMqttImageHeight() or capHeight}"
+        )
+    if args.getClipDir():
+        logger.debug(
+            f"alert clips are recorded to {args.getClipDir()}, "
+            f"pre-roll: {args.getClipPreRoll()}s, post-roll: {args.getClipPostRoll()}s, "
+            f"quota: {args.getClipQuota()}MB"
+        )
+    if pipelined:
+        logger.debug(
+            f"pipeline queue size: {args.getQueueSize()}, drop policy: {args.getDropPolicy()}"
+        )
 
     # System signal handlers
     signal(
         SIGTERM,
         lambda __sig__, __frame__: handleInterrupt(
-            publisher, video, logger,
+            publisher, videos, pipelines, recorders, detector, logger,
         ),
     )
     signal(
         SIGINT,
         lambda __sig__, __frame__: handleInterrupt(
-            publisher, video, logger,
+            publisher, videos, pipelines, recorders, detector, logger,
         ),
     )
 
-    bufferData = Buffer()  # buffer to hold image data
-    Thread(
-        target=setupWebServer,
-        args=(
-            bufferData,
+    if args.getHttpServer() == "asyncio":
+        server = setupStreamServer(
+            streams,
+            snapshots,
+            metrics,
             args.getHttpHost(),
             args.getHttpPort(),
-            args.getHttpPath(),
-        ),
-    ).start()
+            args.getMaxViewers(),
+            logger,
+        )
+        for path, monitor in monitorOf.items():
+            monitor.setViewers(lambda path=path: server.getReadyClients(path))
+        logger.debug(f"streaming to at most {args.getMaxViewers()} viewer(s)")
+    else:
+        for path, monitor in monitorOf.items():
+            # A Flask viewer waiting on the buffer has sent every frame so far
+            monitor.setViewers(streams[path].getWaiting)
+        Thread(
+            target=setupWebServer,
+            args=(
+                streams,
+                snapshots,
+                metrics,
+                args.getHttpHost(),
+                args.getHttpPort(),
+            ),
+        ).start()
 
     logger.info("successfully initialized object detector")
+    pipelineOf: Dict[str, Pipeline] = {}
+    for monitor in monitors:
+        if not pipelined:
+            Thread(
+                target=runMonitor,
+                args=(monitor, logger),
+                name=f"camera-{monitor.getName()}",
+                daemon=True,
+            ).start()
+            continue
+
+        # Each stage runs on its own thread, throughput is bound by the slowest one
+        pipeline = Pipeline(args.getQueueSize(), args.getDropPolicy(), logger)
+        pipeline.addSource("capture", monitor.capture)
+        # Keep as many frames in flight as there are detectors to run them
+        pipeline.addStage("inference", monitor.detect, workers=detector.getSize())
+        if monitor.hasTracker():
+            pipeline.addStage("track", monitor.track)
+        pipeline.addStage("render", monitor.render)
+        pipeline.addStage("publish", monitor.publish)
+        pipeline.start()
+        metrics.counter(
+            "warehouse_frames_dropped_total",
+            "Frames lost before they were published",
+            {"camera": monitor.getName(), "reason": "queue"},
+            function=lambda pipeline=pipeline: sum(
+                stage.get("dropped", 0) for stage in pipeline.getStats()
+            ),
+        )
+        pipelines.append(pipeline)
+        pipelineOf[monitor.getName()] = pipeline
+        logger.info(
+            f"started pipeline stages for camera {monitor.getName()}"
+        )
+
     while True:
-        currentTime = round(time() * 1000)
-        videoFrame = video.capture()
-
-        # Filter out all non-person detections
-        detectionResult = [
-            detection for detection in detector.getDetections(videoFrame)
-            if detection.categories[0].category_name == "person"
-        ]
-
-        personData = []
-        for index, person in enumerate(detectionResult):
-            x1 = person.bounding_box.origin_x
-            y1 = person.bounding_box.origin_y
-            x2 = x1 + person.bounding_box.width
-            y2 = y1 + person.bounding_box.height
-            score = person.categories[0].score
-            personData.append({
-                "index": index,
-                "x1": x1,
-                "y1": y1,
-                "x2": x2,
-                "y2": y2,
-                "score": score,
-            })
-            videoFrame = detector.markDetection(videoFrame, (x1, y1, x2, y2))
-
-        # Add timestamp to image
-        currentTimeObj = localtime(currentTime/1000)
-        detector.setCustomText(
-            videoFrame,
-            (10, 20),
-            f"{strftime('%Y-%m-%d %H:%M:%S', currentTimeObj)} {currentTimeObj.tm_zone}",
-        )
-
-        # Add description to image
-        detector.setCustomText(
-            videoFrame,
-            (10, 40),
-            description
-        )
-        _, buffer = imencode(".jpeg", videoFrame)
-
-        # Add image to buffer
-        bufferData.setData(buffer.tobytes())
-        # Send message to MQTT server with base64 encoded image
-        snapshot = b64encode(buffer).decode("utf-8")
-        payload = {
-            "snapshot": {"image": f"data:image/jpeg;base64,{snapshot}", "width": capWidth, "height": capHeight},
-            "timestamp": currentTime,
-            "persons": {
-                "count": len(personData),
-                "data": personData
-            },
-            "alert": len(personData) > 0
-        }
-        mqttClient.publish(mqttTopic, dumps(payload))
+        sleep(args.getStatsInterval())
+        for monitor in monitors:
+            pipeline = pipelineOf.get(monitor.getName())
+            stats = formatStats(
+                pipeline.getStats() if pipeline is not None else [],
+                monitor.getStats(),
+            )
+            if stats:
+                logger.info(f"camera {monitor.getName()}: {stats}")
 
 
 if __name__ == "__main__":
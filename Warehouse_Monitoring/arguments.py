@@ -1,22 +1,172 @@
-from argparse import ArgumentParser
-from typing import List
+from argparse import ArgumentParser, ArgumentTypeError
+from typing import Dict, List, Optional, Tuple, Union
+
+
+# Indexed by --model
+MODEL_PATHS: List[str] = [
+    'model/efficientdet_lite0_int8.tflite',
+    'model/efficientdet_lite0_float16.tflite',
+    'model/efficientdet_lite0_float32.tflite',
+    'model/efficientdet_lite2_int8.tflite',
+    'model/efficientdet_lite2_float16.tflite',
+    'model/efficientdet_lite2_float32.tflite',
+    'model/ssd_mobilenet_v2_float16.tflite',
+    'model/ssd_mobilenet_v2_float32.tflite',
+]
+
+# Relative detection quality of each model above, higher is better. The
+# larger backbone matters most, int8 loses a little against float
+MODEL_ACCURACY: List[int] = [2, 3, 3, 5, 6, 6, 1, 1]
+
+MODEL_AUTO = "auto"
+
+
+class CameraOptions:
+
+    __device: str
+    __description: str
+    __mqttTopic: str
+    __mqttImageTopic: str
+    __mqttEventTopic: str
+    __httpPath: str
+    __zonesPath: str
+
+    def __init__(
+        self,
+        device: str,
+        description: str,
+        mqttTopic: str,
+        mqttImageTopic: str,
+        mqttEventTopic: str,
+        httpPath: str,
+        zonesPath: str,
+    ) -> None:
+        self.__device = device
+        self.__description = description
+        self.__mqttTopic = mqttTopic
+        self.__mqttImageTopic = mqttImageTopic
+        self.__mqttEventTopic = mqttEventTopic
+        self.__httpPath = httpPath
+        self.__zonesPath = zonesPath
+
+    def getCaptureDevice(self) -> str:
+        return self.__device
+
+    def getDescription(self) -> str:
+        return self.__description
+
+    def getMqttTopic(self) -> str:
+        return self.__mqttTopic
+
+    def getMqttImageTopic(self) -> str:
+        return self.__mqttImageTopic
+
+    def getMqttEventTopic(self) -> str:
+        return self.__mqttEventTopic
+
+    def getHttpPath(self) -> str:
+        return self.__httpPath
+
+    def getSnapshotPath(self) -> str:
+        # Full resolution still next to the stream, /snapshot.jpg for /
+        return f"{self.__httpPath.rstrip('/')}/snapshot.jpg"
+
+    def getZonesPath(self) -> str:
+        return self.__zonesPath
+
+
+def parseModel(value: str) -> Union[int, str]:
+    if value == MODEL_AUTO:
+        return value
+    if not value.isdigit() or int(value) >= len(MODEL_PATHS):
+        raise ArgumentTypeError(f"model must be auto or 0-{len(MODEL_PATHS) - 1}: {value}")
+    return int(value)
+
+
+def parseCameraSpec(spec: str) -> Dict[str, str]:
+    # "device=1,topic=warehouse/a,path=/a,description=Room A, aisle 3"
+    # a segment without "=" belongs to the previous value so descriptions
+    # may contain commas
+    options: Dict[str, str] = {}
+    key = None
+    for segment in spec.split(","):
+        name, separator, value = segment.partition("=")
+        if separator and name.strip() in ("device", "topic", "image_topic", "event_topic", "path", "zones", "description"):
+            key = name.strip()
+            options[key] = value
+        elif key is not None:
+            options[key] += f",{segment}"
+        else:
+            raise ArgumentTypeError(f"invalid camera option: {segment}")
+    if not options.get("device"):
+        raise ArgumentTypeError(f"camera device is required: {spec}")
+    return options
 
 
 class Arguments:
 
     __description: str
-    __captureDevice: int
+    __captureDevice: str
+    __fourcc: str
+    __captureFps: float
     __captureWidth: int
     __captureHeight: int
-    __modelIndex: int
+    __modelIndex: Union[int, str]
+    __autoFps: float
+    __modelCache: str
     __scoreThreshold: float
     __mqttHost: str
     __mqttPort: int
     __mqttTopic: str
+    __mqttImageTopic: str
+    __mqttEventTopic: str
+    __publishMode: str
     __httpHost: str
     __httpPort: int
+    __httpServer: str
+    __maxViewers: int
     __httpPath: str
     __debug: bool
+    __pipeline: bool
+    __queueSize: int
+    __dropPolicy: str
+    __statsInterval: float
+    __motionGate: bool
+    __motionThreshold: float
+    __motionDownscale: int
+    __motionMaxSkip: int
+    __cameras: List[CameraOptions]
+    __detectorPool: int
+    __inferenceProcesses: int
+    __zonesPath: str
+    __zoneMaxSize: int
+    __tiles: Tuple[int, int]
+    __tileOverlap: float
+    __tileRegion: Optional[Tuple[int, int, int, int]]
+    __tileMergeThreshold: float
+    __events: bool
+    __heartbeatInterval: float
+    __dwellTime: float
+    __trackIou: float
+    __trackMaxMisses: int
+    __detectInterval: int
+    __redetectScore: float
+    __redetectOnChange: bool
+    __targetFps: float
+    __cpuBudget: float
+    __minJpegQuality: int
+    __maxDetectInterval: int
+    __streamHeight: int
+    __mqttImageHeight: int
+    __clipDir: str
+    __clipPreRoll: float
+    __clipPostRoll: float
+    __clipMaxLength: float
+    __clipMemory: float
+    __clipQuota: float
+    __spoolDir: str
+    __spoolSize: float
+    __spoolMemory: float
 
     def __init__(self):
         parser = ArgumentParser()
@@ -28,9 +178,24 @@ class Arguments:
         )
         parser.add_argument(
             "--device",
-            type=int,
+            type=str,
+            default="0",
+            help="""
+            Video source: a camera index or /dev/videoN (V4L2), rtsp://<url>,
+            gst:<GStreamer pipeline> or a video file played in a loop (default: 0)
+            """,
+        )
+        parser.add_argument(
+            "--fourcc",
+            type=str,
+            default="MJPG",
+            help="Pixel format requested from V4L2 cameras, empty keeps the driver default (default: MJPG)",
+        )
+        parser.add_argument(
+            "--capture_fps",
+            type=float,
             default=0,
-            help="Device ID of your camera (default: 0)",
+            help="Frame rate requested from V4L2 cameras, 0 keeps the driver default (default: 0)",
         )
         parser.add_argument(
             "--width",
@@ -46,7 +211,7 @@ class Arguments:
         )
         parser.add_argument(
             "--model",
-            type=int,
+            type=parseModel,
             default=0,
             help="""
             0: EfficientDet-Lite0 (int8)
@@ -57,9 +222,21 @@ class Arguments:
             5: EfficientDet-Lite2 (float 32)
             6: SSDMobileNet-V2 (int8)
             7: SSDMobileNet-V2 (float 32)
+            auto: the most accurate model that holds --auto_fps on this machine
             (default: 0)
             """,
-            choices=[0, 1, 2, 3, 4, 5, 6, 7],
+        )
+        parser.add_argument(
+            "--auto_fps",
+            type=float,
+            default=0,
+            help="Inference frame rate --model auto has to reach, 0 uses --target_fps or 10 (default: 0)",
+        )
+        parser.add_argument(
+            "--model_cache",
+            type=str,
+            default="model/benchmark.json",
+            help="File --model auto keeps its measurements in (default: model/benchmark.json)",
         )
         parser.add_argument(
             "--score_threshold",
@@ -85,6 +262,29 @@ class Arguments:
             default="msg",
             help="MQTT topic (default: msg)",
         )
+        parser.add_argument(
+            "--mqtt_image_topic",
+            type=str,
+            default="",
+            help="MQTT topic for raw JPEG snapshots in split mode (default: <mqtt_topic>/image)",
+        )
+        parser.add_argument(
+            "--mqtt_event_topic",
+            type=str,
+            default="",
+            help="MQTT topic for tracker events and heartbeats (default: <mqtt_topic>/events)",
+        )
+        parser.add_argument(
+            "--publish_mode",
+            type=str,
+            default="combined",
+            help="""
+            combined: base64 snapshot embedded in the JSON message
+            split: raw JPEG on the image topic, compact JSON on the detection topic
+            (default: combined)
+            """,
+            choices=["combined", "split"],
+        )
         parser.add_argument(
             "--http_host",
             type=str,
@@ -97,6 +297,19 @@ class Arguments:
             default=2001,
             help="HTTP port (default: 2001)",
         )
+        parser.add_argument(
+            "--http_server",
+            type=str,
+            choices=["asyncio", "flask"],
+            default="flask",
+            help="flask uses a thread per viewer, asyncio serves all viewers from one thread and skips frames for slow ones (default: flask)",
+        )
+        parser.add_argument(
+            "--max_viewers",
+            type=int,
+            default=20,
+            help="Concurrent MJPEG viewers over all streams with the asyncio server (default: 20)",
+        )
         parser.add_argument(
             "--http_path",
             type=str,
@@ -109,46 +322,397 @@ class Arguments:
             default=False,
             help="Enable debug mode (default: false)",
         )
+        parser.add_argument(
+            "--pipeline",
+            action="store_true",
+            help="Run capture, inference, render and publish as separate stages, always on with more than one detector (default: false)",
+        )
+        parser.add_argument(
+            "--queue_size",
+            type=int,
+            default=2,
+            help="Maximum number of frames queued between pipeline stages (default: 2)",
+        )
+        parser.add_argument(
+            "--drop_policy",
+            type=str,
+            default="drop_oldest",
+            help="What to do when a pipeline queue is full (default: drop_oldest)",
+            choices=["drop_oldest", "block"],
+        )
+        parser.add_argument(
+            "--stats_interval",
+            type=float,
+            default=10,
+            help="Interval in seconds between statistics reports (default: 10)",
+        )
+        parser.add_argument(
+            "--motion_gate",
+            action="store_true",
+            help="Skip inference while the scene is static (default: false)",
+        )
+        parser.add_argument(
+            "--motion_threshold",
+            type=float,
+            default=0.01,
+            help="Fraction of changed pixels that counts as motion (default: 0.01)",
+        )
+        parser.add_argument(
+            "--motion_downscale",
+            type=int,
+            default=8,
+            help="Downscale factor applied before frame differencing (default: 8)",
+        )
+        parser.add_argument(
+            "--motion_max_skip",
+            type=int,
+            default=30,
+            help="Maximum number of consecutive frames without inference (default: 30)",
+        )
+        parser.add_argument(
+            "--camera",
+            type=parseCameraSpec,
+            action="append",
+            default=[],
+            help="""
+            Add a camera, can be repeated to monitor several cameras in one process.
+            Format: device=<source>[,topic=<mqtt topic>][,image_topic=<mqtt topic>][,event_topic=<mqtt topic>][,path=<http path>][,zones=<file>][,description=<text>]
+            Omitted values fall back to --mqtt_topic, --http_path, --zones and --description.
+            (default: a single camera from --device)
+            """,
+        )
+        parser.add_argument(
+            "--detector_pool",
+            type=int,
+            default=1,
+            help="Number of detector instances shared by all cameras, more than one turns on --pipeline (default: 1)",
+        )
+        parser.add_argument(
+            "--inference_processes",
+            type=int,
+            default=0,
+            help="Run inference in this many worker processes, 0 runs it in the main process, more than one turns on --pipeline (default: 0)",
+        )
+        parser.add_argument(
+            "--zones",
+            type=str,
+            default="",
+            help="JSON file with detection zones, only zone crops are inferred (default: '', whole frame)",
+        )
+        parser.add_argument(
+            "--zone_max_size",
+            type=int,
+            default=320,
+            help="Zone crops are downscaled to at most this many pixels on their longest side, 0 keeps them (default: 320)",
+        )
+        parser.add_argument(
+            "--tiles",
+            type=str,
+            default="",
+            help="Also run the model on a grid of COLUMNSxROWS tiles, e.g. 3x2, to find distant persons (default: off)",
+        )
+        parser.add_argument(
+            "--tile_overlap",
+            type=float,
+            default=0.2,
+            help="Fraction of a tile shared with its neighbours (default: 0.2)",
+        )
+        parser.add_argument(
+            "--tile_region",
+            type=str,
+            default="",
+            help="Only tile this x1,y1,x2,y2 part of the frame, e.g. the far end of the room (default: whole frame)",
+        )
+        parser.add_argument(
+            "--tile_merge_threshold",
+            type=float,
+            default=0.6,
+            help="Boxes from different tiles overlapping more than this are merged, relative to the smaller box (default: 0.6)",
+        )
+        parser.add_argument(
+            "--events",
+            action="store_true",
+            help="Track persons and publish enter/exit/dwell events, full messages only on change (default: false)",
+        )
+        parser.add_argument(
+            "--heartbeat_interval",
+            type=float,
+            default=30,
+            help="Seconds between heartbeats on the event topic (default: 30)",
+        )
+        parser.add_argument(
+            "--dwell_time",
+            type=float,
+            default=30,
+            help="Seconds a person has to stay before a dwell event, repeated every period (default: 30)",
+        )
+        parser.add_argument(
+            "--track_iou",
+            type=float,
+            default=0.3,
+            help="Minimum IoU to match a detection to an existing track (default: 0.3)",
+        )
+        parser.add_argument(
+            "--track_max_misses",
+            type=int,
+            default=15,
+            help="Frames a track may go undetected before an exit event (default: 15)",
+        )
+        parser.add_argument(
+            "--detect_interval",
+            type=int,
+            default=1,
+            help="Run the model every N frames, boxes in between are predicted by the tracker (default: 1)",
+        )
+        parser.add_argument(
+            "--redetect_score",
+            type=float,
+            default=0,
+            help="Run the model on the next frame when a person scored below this, 0 disables (default: 0)",
+        )
+        parser.add_argument(
+            "--redetect_on_change",
+            action="store_true",
+            help="Run the model on the next frame when the number of persons changed (default: false)",
+        )
+        parser.add_argument(
+            "--target_fps",
+            type=float,
+            default=0,
+            help="Frame rate to hold per camera, the loop is paced and degraded to reach it, 0 runs unpaced (default: 0)",
+        )
+        parser.add_argument(
+            "--cpu_budget",
+            type=float,
+            default=0,
+            help="CPU usage in percent of one core the process should stay under, 0 disables (default: 0)",
+        )
+        parser.add_argument(
+            "--min_jpeg_quality",
+            type=int,
+            default=40,
+            help="Lowest JPEG quality the rate controller may choose (default: 40)",
+        )
+        parser.add_argument(
+            "--max_detect_interval",
+            type=int,
+            default=4,
+            help="Most frames the rate controller may run the model on only once (default: 4)",
+        )
+        parser.add_argument(
+            "--stream_height",
+            type=int,
+            default=0,
+            help="Height of the MJPEG stream, frames are scaled down to it, 0 keeps the capture size (default: 0)",
+        )
+        parser.add_argument(
+            "--mqtt_image_height",
+            type=int,
+            default=0,
+            help="Height of the snapshot published to MQTT, 0 keeps the capture size (default: 0)",
+        )
+        parser.add_argument(
+            "--clip_dir",
+            type=str,
+            default="",
+            help="Directory to record alert clips to, empty disables recording (default: empty)",
+        )
+        parser.add_argument(
+            "--clip_pre_roll",
+            type=float,
+            default=5,
+            help="Seconds recorded before an alert (default: 5)",
+        )
+        parser.add_argument(
+            "--clip_post_roll",
+            type=float,
+            default=5,
+            help="Seconds recorded after the last person left (default: 5)",
+        )
+        parser.add_argument(
+            "--clip_max_length",
+            type=float,
+            default=60,
+            help="Longest clip in seconds, a longer alert continues in a new clip (default: 60)",
+        )
+        parser.add_argument(
+            "--clip_memory",
+            type=float,
+            default=64,
+            help="Memory in MB per camera for the pre-roll and for frames waiting to be written (default: 64)",
+        )
+        parser.add_argument(
+            "--clip_quota",
+            type=float,
+            default=1024,
+            help="Disk space in MB for all clips, the oldest are deleted beyond it (default: 1024)",
+        )
+        parser.add_argument(
+            "--spool_dir",
+            type=str,
+            default="",
+            help="Directory to keep MQTT messages in while the broker is unreachable, empty disables (default: empty)",
+        )
+        parser.add_argument(
+            "--spool_size",
+            type=float,
+            default=256,
+            help="Disk space in MB for waiting MQTT messages, snapshots are dropped first beyond it (default: 256)",
+        )
+        parser.add_argument(
+            "--spool_memory",
+            type=float,
+            default=16,
+            help="MQTT payload in MB that may be queued in memory before messages go to disk (default: 16)",
+        )
 
         cmd = parser.parse_args()
         self.__description = cmd.description
         self.__captureDevice = cmd.device
+        if len(cmd.fourcc) not in (0, 4):
+            parser.error("--fourcc needs exactly four characters, e.g. MJPG or YUYV")
+        self.__fourcc = cmd.fourcc
+        self.__captureFps = max(0, cmd.capture_fps)
         self.__captureWidth = cmd.width
         self.__captureHeight = cmd.height
         self.__modelIndex = cmd.model
+        self.__autoFps = max(cmd.auto_fps, 0) or max(cmd.target_fps, 0) or 10
+        self.__modelCache = cmd.model_cache
         self.__scoreThreshold = cmd.score_threshold
         self.__debug = cmd.debug
         self.__mqttHost = cmd.mqtt_host
         self.__mqttPort = cmd.mqtt_port
         self.__mqttTopic = cmd.mqtt_topic
+        self.__mqttImageTopic = cmd.mqtt_image_topic or f"{cmd.mqtt_topic}/image"
+        self.__mqttEventTopic = cmd.mqtt_event_topic or f"{cmd.mqtt_topic}/events"
+        self.__publishMode = cmd.publish_mode
         self.__httpHost = cmd.http_host
         self.__httpPort = cmd.http_port
+        self.__httpServer = cmd.http_server
+        self.__maxViewers = max(1, cmd.max_viewers)
         self.__httpPath = cmd.http_path
+        self.__pipeline = cmd.pipeline
+        self.__queueSize = cmd.queue_size
+        self.__dropPolicy = cmd.drop_policy
+        self.__statsInterval = cmd.stats_interval
+        self.__motionGate = cmd.motion_gate
+        self.__motionThreshold = cmd.motion_threshold
+        self.__motionDownscale = cmd.motion_downscale
+        self.__motionMaxSkip = cmd.motion_max_skip
+        self.__detectorPool = max(1, cmd.detector_pool)
+        self.__inferenceProcesses = max(0, cmd.inference_processes)
+        self.__zonesPath = cmd.zones
+        self.__zoneMaxSize = max(0, cmd.zone_max_size)
+        self.__tiles = (0, 0)
+        if cmd.tiles:
+            columns, _, rows = cmd.tiles.lower().partition("x")
+            if not columns.isdigit() or not rows.isdigit() or int(columns) * int(rows) == 0:
+                parser.error(f"--tiles needs COLUMNSxROWS, e.g. 3x2: {cmd.tiles}")
+            self.__tiles = (int(columns), int(rows))
+        if not 0 <= cmd.tile_overlap < 1:
+            parser.error("--tile_overlap must be at least 0 and below 1")
+        self.__tileOverlap = cmd.tile_overlap
+        self.__tileRegion = None
+        if cmd.tile_region:
+            try:
+                x1, y1, x2, y2 = (int(value) for value in cmd.tile_region.split(","))
+            except ValueError:
+                parser.error(f"--tile_region needs x1,y1,x2,y2: {cmd.tile_region}")
+            if x2 <= x1 or y2 <= y1:
+                parser.error(f"--tile_region is empty: {cmd.tile_region}")
+            self.__tileRegion = (x1, y1, x2, y2)
+        self.__tileMergeThreshold = cmd.tile_merge_threshold
+        self.__events = cmd.events
+        self.__heartbeatInterval = cmd.heartbeat_interval
+        self.__dwellTime = cmd.dwell_time
+        self.__trackIou = cmd.track_iou
+        self.__trackMaxMisses = cmd.track_max_misses
+        self.__detectInterval = max(1, cmd.detect_interval)
+        self.__redetectScore = cmd.redetect_score
+        self.__redetectOnChange = cmd.redetect_on_change
+        self.__targetFps = max(0, cmd.target_fps)
+        self.__cpuBudget = max(0, cmd.cpu_budget)
+        self.__minJpegQuality = min(max(cmd.min_jpeg_quality, 1), 95)
+        self.__maxDetectInterval = max(1, cmd.max_detect_interval)
+        self.__streamHeight = max(0, cmd.stream_height)
+        self.__mqttImageHeight = max(0, cmd.mqtt_image_height)
+        self.__clipDir = cmd.clip_dir
+        self.__clipPreRoll = max(0, cmd.clip_pre_roll)
+        self.__clipPostRoll = max(0, cmd.clip_post_roll)
+        self.__clipMaxLength = max(1, cmd.clip_max_length)
+        self.__clipMemory = max(1, cmd.clip_memory)
+        self.__clipQuota = max(1, cmd.clip_quota)
+        self.__spoolDir = cmd.spool_dir
+        self.__spoolSize = max(1, cmd.spool_size)
+        self.__spoolMemory = max(1, cmd.spool_memory)
+        self.__cameras = [
+            CameraOptions(
+                camera["device"],
+                camera.get("description", cmd.description),
+                camera.get("topic", cmd.mqtt_topic),
+                camera.get(
+                    "image_topic",
+                    f"{camera['topic']}/image" if "topic" in camera else self.__mqttImageTopic,
+                ),
+                camera.get(
+                    "event_topic",
+                    f"{camera['topic']}/events" if "topic" in camera else self.__mqttEventTopic,
+                ),
+                camera.get("path", cmd.http_path),
+                camera.get("zones", cmd.zones),
+            )
+            for camera in cmd.camera
+        ] or [
+            CameraOptions(
+                self.__captureDevice,
+                self.__description,
+                self.__mqttTopic,
+                self.__mqttImageTopic,
+                self.__mqttEventTopic,
+                self.__httpPath,
+                self.__zonesPath,
+            ),
+        ]
+        paths = [camera.getHttpPath() for camera in self.__cameras]
+        if len(set(paths)) != len(paths):
+            parser.error("each camera needs its own HTTP path")
+        if "/metrics" in paths:
+            parser.error("HTTP path /metrics is reserved for the metrics endpoint")
+        if any(camera.getSnapshotPath() in paths for camera in self.__cameras):
+            parser.error("HTTP paths ending in /snapshot.jpg are reserved for snapshots")
 
     def getDescription(self) -> str:
         return self.__description
 
-    def getCaptureDevice(self) -> int:
+    def getCaptureDevice(self) -> str:
         return self.__captureDevice
 
+    def getFourcc(self) -> str:
+        return self.__fourcc
+
+    def getCaptureFps(self) -> float:
+        return self.__captureFps
+
     def getVideoWidth(self) -> int:
         return self.__captureWidth
 
     def getVideoHeight(self) -> int:
         return self.__captureHeight
 
-    def getModelPath(self) -> int:
-        modelMap: List[str] = [
-            'model/efficientdet_lite0_int8.tflite',
-            'model/efficientdet_lite0_float16.tflite',
-            'model/efficientdet_lite0_float32.tflite',
-            'model/efficientdet_lite2_int8.tflite',
-            'model/efficientdet_lite2_float16.tflite',
-            'model/efficientdet_lite2_float32.tflite',
-            'model/ssd_mobilenet_v2_float16.tflite',
-            'model/ssd_mobilenet_v2_float32.tflite',
-        ]
-        return modelMap[self.__modelIndex]
+    def getModelAuto(self) -> bool:
+        return self.__modelIndex == MODEL_AUTO
+
+    def getModelPath(self) -> str:
+        # Empty with --model auto, the model is picked once frames come in
+        if self.__modelIndex == MODEL_AUTO:
+            return ""
+        return MODEL_PATHS[self.__modelIndex]
+
+    def getAutoFps(self) -> float:
+        return self.__autoFps
+
+    def getModelCache(self) -> str:
+        return self.__modelCache
 
     def getScoreThreshold(self) -> float:
         return self.__scoreThreshold
@@ -165,6 +729,12 @@ class Arguments:
     def getMqttTopic(self) -> str:
         return self.__mqttTopic
 
+    def getMqttImageTopic(self) -> str:
+        return self.__mqttImageTopic
+
+    def getPublishMode(self) -> str:
+        return self.__publishMode
+
     def getHttpHost(self) -> str:
         return self.__httpHost
 
@@ -173,3 +743,130 @@ class Arguments:
 
     def getHttpPath(self) -> str:
         return self.__httpPath
+
+    def getPipeline(self) -> bool:
+        return self.__pipeline
+
+    def getQueueSize(self) -> int:
+        return self.__queueSize
+
+    def getDropPolicy(self) -> str:
+        return self.__dropPolicy
+
+    def getStatsInterval(self) -> float:
+        return self.__statsInterval
+
+    def getMotionGate(self) -> bool:
+        return self.__motionGate
+
+    def getMotionThreshold(self) -> float:
+        return self.__motionThreshold
+
+    def getMotionDownscale(self) -> int:
+        return self.__motionDownscale
+
+    def getMotionMaxSkip(self) -> int:
+        return self.__motionMaxSkip
+
+    def getCameras(self) -> List[CameraOptions]:
+        return self.__cameras
+
+    def getDetectorPool(self) -> int:
+        return self.__detectorPool
+
+    def getInferenceProcesses(self) -> int:
+        return self.__inferenceProcesses
+
+    def getZonesPath(self) -> str:
+        return self.__zonesPath
+
+    def getZoneMaxSize(self) -> int:
+        return self.__zoneMaxSize
+
+    def getTiles(self) -> Tuple[int, int]:
+        # (0, 0) when tiling is off
+        return self.__tiles
+
+    def getTileOverlap(self) -> float:
+        return self.__tileOverlap
+
+    def getTileRegion(self) -> Optional[Tuple[int, int, int, int]]:
+        return self.__tileRegion
+
+    def getTileMergeThreshold(self) -> float:
+        return self.__tileMergeThreshold
+
+    def getEvents(self) -> bool:
+        return self.__events
+
+    def getHeartbeatInterval(self) -> float:
+        return self.__heartbeatInterval
+
+    def getDwellTime(self) -> float:
+        return self.__dwellTime
+
+    def getTrackIou(self) -> float:
+        return self.__trackIou
+
+    def getTrackMaxMisses(self) -> int:
+        return self.__trackMaxMisses
+
+    def getDetectInterval(self) -> int:
+        return self.__detectInterval
+
+    def getRedetectScore(self) -> float:
+        return self.__redetectScore
+
+    def getRedetectOnChange(self) -> bool:
+        return self.__redetectOnChange
+
+    def getTargetFps(self) -> float:
+        return self.__targetFps
+
+    def getCpuBudget(self) -> float:
+        return self.__cpuBudget
+
+    def getMinJpegQuality(self) -> int:
+        return self.__minJpegQuality
+
+    def getMaxDetectInterval(self) -> int:
+        return self.__maxDetectInterval
+
+    def getHttpServer(self) -> str:
+        return self.__httpServer
+
+    def getMaxViewers(self) -> int:
+        return self.__maxViewers
+
+    def getStreamHeight(self) -> int:
+        return self.__streamHeight
+
+    def getMqttImageHeight(self) -> int:
+        return self.__mqttImageHeight
+
+    def getClipDir(self) -> str:
+        return self.__clipDir
+
+    def getClipPreRoll(self) -> float:
+        return self.__clipPreRoll
+
+    def getClipPostRoll(self) -> float:
+        return self.__clipPostRoll
+
+    def getClipMaxLength(self) -> float:
+        return self.__clipMaxLength
+
+    def getClipMemory(self) -> float:
+        return self.__clipMemory
+
+    def getClipQuota(self) -> float:
+        return self.__clipQuota
+
+    def getSpoolDir(self) -> str:
+        return self.__spoolDir
+
+    def getSpoolSize(self) -> float:
+        return self.__spoolSize
+
+    def getSpoolMemory(self) -> float:
+        return self.__spoolMemory
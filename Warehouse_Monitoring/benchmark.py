@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from argparse import ArgumentParser
+from json import dumps
+from multiprocessing import get_context
+from os import cpu_count
+from platform import machine, platform, processor, python_version
+from resource import RUSAGE_SELF, getrusage
+from threading import Lock
+from time import perf_counter, strftime
+from typing import Any, Dict, List, Optional, Union
+from cv2 import __version__ as cvVersion
+from numpy import array, float64, percentile
+from arguments import MODEL_PATHS
+from buffer import Buffer
+from detector import Detector
+from monitor import Monitor
+from video import SyntheticVideo, Video
+
+
+class LocalMqttClient:
+
+    __messages: int
+    __bytes: int
+    __lock: Lock
+
+    def __init__(self) -> None:
+        self.__messages = 0
+        self.__bytes = 0
+        self.__lock = Lock()
+
+    def publish(
+        self,
+        topic: str,
+        payload: Union[str, bytes],
+        qos: int = 0,
+        retain: bool = False,
+    ) -> None:
+        # Stands in for the paho client, only counts what would have been sent
+        with self.__lock:
+            self.__messages += 1
+            self.__bytes += len(payload)
+
+    def getMessages(self) -> int:
+        return self.__messages
+
+    def getBytes(self) -> int:
+        return self.__bytes
+
+
+class SampleRecorder:
+
+    __samples: List[float]
+
+    def __init__(self) -> None:
+        self.__samples = []
+
+    def observe(self, value: float) -> None:
+        self.__samples.append(value)
+
+    def inc(self, amount: float = 1) -> None:
+        self.__samples.append(amount)
+
+    def getSamples(self) -> List[float]:
+        return self.__samples
+
+
+class SampleMetrics:
+
+    __recorders: Dict[str, SampleRecorder]
+
+    def __init__(self) -> None:
+        self.__recorders = {}
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Dict[str, str] = {},
+        **kwargs: Any,
+    ) -> SampleRecorder:
+        # Same calls as Metrics, but every sample is kept for exact percentiles
+        return self.__recorders.setdefault(labels.get("stage", name), SampleRecorder())
+
+    def counter(
+        self,
+        name: str,
+        help: str,
+        labels: Dict[str, str] = {},
+        **kwargs: Any,
+    ) -> SampleRecorder:
+        return self.__recorders.setdefault(name, SampleRecorder())
+
+    def getSamples(self, name: str) -> List[float]:
+        return self.__recorders.setdefault(name, SampleRecorder()).getSamples()
+
+    def getStages(self) -> List[str]:
+        return [name for name in self.__recorders if not name.endswith("_total")]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    if len(samples) == 0:
+        return {}
+    values = array(samples, dtype=float64) * 1000
+    p50, p95, p99 = percentile(values, (50, 95, 99))
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(values.mean()), 3),
+    }
+
+
+def runModel(
+    modelIndex: int,
+    source: Optional[str],
+    width: int,
+    height: int,
+    frames: int,
+    warmup: int,
+    scoreThreshold: float,
+    publishMode: str,
+    streamHeight: int,
+    mqttImageHeight: int,
+) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"model": modelIndex, "path": MODEL_PATHS[modelIndex]}
+    try:
+        detector = Detector(MODEL_PATHS[modelIndex], scoreThreshold)
+    except Exception as error:
+        result["error"] = repr(error)
+        return result
+
+    # Files are replayed as fast as the loop takes them, not at their frame rate
+    video = (
+        Video(source, width, height, realtime=False) if source
+        else SyntheticVideo(width, height)
+    )
+    mqttClient = LocalMqttClient()
+    monitor = Monitor(
+        video, detector, Buffer(), mqttClient, "benchmark",
+        width, height, "benchmark", "benchmark/image", publishMode,
+    )
+    monitor.setName("benchmark")
+    monitor.setRenditions(streamHeight, mqttImageHeight)
+    for _ in range(warmup):
+        monitor.process()
+
+    # Recording starts after warm up, the first inferences are much slower
+    metrics = SampleMetrics()
+    monitor.setMetrics(metrics)
+    totals: List[float] = []
+    messages, published = mqttClient.getMessages(), mqttClient.getBytes()
+    startTime = perf_counter()
+    for _ in range(frames):
+        frameStart = perf_counter()
+        monitor.process()
+        totals.append(perf_counter() - frameStart)
+    elapsed = perf_counter() - startTime
+
+    result["fps"] = round(frames / elapsed, 2)
+    result["stages"] = {
+        stage: summarize(metrics.getSamples(stage)) for stage in metrics.getStages()
+    }
+    result["stages"]["total"] = summarize(totals)
+    result["dropped"] = len(metrics.getSamples("warehouse_frames_dropped_total"))
+    result["mqtt"] = {
+        "messages": mqttClient.getMessages() - messages,
+        "bytes": mqttClient.getBytes() - published,
+    }
+    # Kilobytes on Linux, each model runs in its own process so this is
+    # the peak of this model alone
+    result["peak_rss_mb"] = round(getrusage(RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    video.close()
+    detector.close()
+    return result
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark the monitor loop without camera or MQTT broker")
+    parser.add_argument(
+        "--source",
+        type=str,
+        default="",
+        help="Recorded video file to replay in a loop, synthetic frames when omitted",
+    )
+    parser.add_argument(
+        "--models",
+        type=str,
+        default=",".join(str(index) for index in range(len(MODEL_PATHS))),
+        help="Comma separated --model indexes to benchmark (default: all)",
+    )
+    parser.add_argument("--width", type=int, default=960, help="Frame width (default: 960)")
+    parser.add_argument("--height", type=int, default=540, help="Frame height (default: 540)")
+    parser.add_argument(
+        "--frames",
+        type=int,
+        default=300,
+        help="Frames measured per model (default: 300)",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=20,
+        help="Frames processed before measuring (default: 20)",
+    )
+    parser.add_argument(
+        "--score_threshold",
+        type=float,
+        default=0.5,
+        help="Score threshold for detections (default: 0.5)",
+    )
+    parser.add_argument(
+        "--publish_mode",
+        type=str,
+        choices=["combined", "split"],
+        default="combined",
+        help="Publish mode to measure (default: combined)",
+    )
+    parser.add_argument(
+        "--stream_height",
+        type=int,
+        default=0,
+        help="Height of the stream rendition, 0 keeps the frame size (default: 0)",
+    )
+    parser.add_argument(
+        "--mqtt_image_height",
+        type=int,
+        default=0,
+        help="Height of the MQTT snapshot, 0 keeps the frame size (default: 0)",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="",
+        help="Write the JSON report to this file instead of stdout",
+    )
+    cmd = parser.parse_args()
+
+    report: Dict[str, Any] = {
+        "date": strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": {
+            "platform": platform(),
+            "machine": machine(),
+            "processor": processor(),
+            "cpus": cpu_count(),
+            "python": python_version(),
+            "opencv": cvVersion,
+        },
+        "source": cmd.source or "synthetic",
+        "width": cmd.width,
+        "height": cmd.height,
+        "frames": cmd.frames,
+        "publish_mode": cmd.publish_mode,
+        "stream_height": cmd.stream_height,
+        "mqtt_image_height": cmd.mqtt_image_height,
+        "results": [],
+    }
+
+    # A fresh process per model, so peak RSS and model state do not carry over
+    context = get_context("spawn")
+    for modelIndex in (int(index) for index in cmd.models.split(",") if index.strip()):
+        with context.Pool(1) as pool:
+            result = pool.apply(runModel, (
+                modelIndex, cmd.source, cmd.width, cmd.height,
+                cmd.frames, cmd.warmup, cmd.score_threshold, cmd.publish_mode,
+                cmd.stream_height, cmd.mqtt_image_height,
+            ))
+        report["results"].append(result)
+
+    output = dumps(report, indent=2)
+    if cmd.output:
+        with open(cmd.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
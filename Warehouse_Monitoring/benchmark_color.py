@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from argparse import ArgumentParser
+from time import perf_counter
+from tracemalloc import get_traced_memory, reset_peak, start, stop
+from typing import Any, Callable, Dict
+from cv2 import COLOR_BGR2RGBA, cvtColor
+from mediapipe import Image as MpImage, ImageFormat as MpImageFormat
+from numpy import random, uint8
+from detector import RgbConverter
+
+
+def convertRgba(frame: Any) -> Any:
+    # Conversion path used by Detector.getDetections before RgbConverter
+    return MpImage(
+        image_format=MpImageFormat.SRGBA,
+        data=cvtColor(frame, COLOR_BGR2RGBA),
+    )
+
+
+def measure(convert: Callable[[Any], Any], frame: Any, iterations: int) -> Dict[str, float]:
+    convert(frame)  # warm up, lets RgbConverter allocate its buffer
+
+    startTime = perf_counter()
+    for _ in range(iterations):
+        convert(frame)
+    elapsed = perf_counter() - startTime
+
+    # Allocations are traced separately so tracing does not skew the timing,
+    # memory allocated inside MediaPipe itself is not visible to tracemalloc
+    start()
+    reset_peak()
+    before, _ = get_traced_memory()
+    for _ in range(iterations):
+        convert(frame)
+    _, peak = get_traced_memory()
+    stop()
+    return {
+        "ms": elapsed / iterations * 1000,
+        "allocated": peak - before,
+    }
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Compare colour conversion paths of Detector")
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=200,
+        help="Frames converted per measurement (default: 200)",
+    )
+    cmd = parser.parse_args()
+
+    converter = RgbConverter()
+    paths: Dict[str, Callable[[Any], Any]] = {
+        "before: new rgba array + mp.Image": convertRgba,
+        "after: reused rgb buffer + mp.Image": lambda frame: MpImage(
+            image_format=MpImageFormat.SRGB,
+            data=converter.convert(frame),
+        ),
+        "after: reused rgb buffer only": converter.convert,
+    }
+    for width, height in ((960, 540), (1920, 1080)):
+        frame = random.randint(0, 255, (height, width, 3), dtype=uint8)
+        for name, convert in paths.items():
+            result = measure(convert, frame, cmd.iterations)
+            print(
+                f"{width}x{height} {name:<36} {result['ms']:7.3f} ms/frame, "
+                f"peak allocation {result['allocated'] / 1024:9.1f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,48 @@
+from threading import Condition
+from typing import Optional, Tuple
+
+
 class Buffer:
 
     __data: bytes
+    __sequence: int
+    __waiting: int
+    __condition: Condition
 
     def __init__(self) -> None:
         self.__data = b""
+        self.__sequence = 0
+        self.__waiting = 0
+        self.__condition = Condition()
 
     def setData(self, data: bytes) -> None:
-        self.__data = data
+        with self.__condition:
+            self.__data = data
+            self.__sequence += 1
+            self.__condition.notify_all()
 
     def getData(self) -> bytes:
         return self.__data
+
+    def getSequence(self) -> int:
+        return self.__sequence
+
+    def getWaiting(self) -> int:
+        # Readers that have taken every frame and wait for the next one
+        return self.__waiting
+
+    def waitData(self, lastSequence: int, timeout: Optional[float] = None) -> Tuple[int, bytes]:
+        # Block until a frame newer than lastSequence lands. Readers that fall
+        # behind skip straight to the latest frame. On timeout the sequence is
+        # returned unchanged so callers can tell nothing new arrived.
+        with self.__condition:
+            if self.__sequence == lastSequence:
+                self.__waiting += 1
+                try:
+                    self.__condition.wait_for(
+                        lambda: self.__sequence != lastSequence,
+                        timeout,
+                    )
+                finally:
+                    self.__waiting -= 1
+            return self.__sequence, self.__data
@@ -0,0 +1,162 @@
+from threading import Lock
+from time import perf_counter, process_time, sleep
+from typing import Any, Dict, Tuple
+
+
+class RateController:
+
+    __targetFps: float
+    __cpuBudget: float
+    __maxQuality: int
+    __minQuality: int
+    __qualityStep: int
+    __maxDetectInterval: int
+    __pipelined: bool
+    __window: float
+    __level: int
+    __pacingFps: float
+    __nextFrame: float
+    __latency: Dict[str, float]
+    __samples: Dict[str, int]
+    __frames: int
+    __windowStart: float
+    __cpuStart: float
+    __operatingPoint: Dict[str, Any]
+    __lock: Lock
+
+    def __init__(
+        self,
+        targetFps: float,
+        cpuBudget: float,
+        minQuality: int = 40,
+        maxDetectInterval: int = 4,
+        pipelined: bool = False,
+        maxQuality: int = 95,
+        qualityStep: int = 10,
+        window: float = 1.0,
+    ) -> None:
+        self.__targetFps = targetFps
+        self.__cpuBudget = cpuBudget
+        self.__maxQuality = maxQuality
+        self.__minQuality = min(minQuality, maxQuality)
+        self.__qualityStep = qualityStep
+        self.__maxDetectInterval = max(1, maxDetectInterval)
+        self.__pipelined = pipelined
+        self.__window = window
+        self.__level = 0
+        # 0 means the loop is not paced at all
+        self.__pacingFps = targetFps
+        self.__nextFrame = 0.0
+        self.__latency = {}
+        self.__samples = {}
+        self.__frames = 0
+        self.__windowStart = perf_counter()
+        self.__cpuStart = process_time()
+        self.__operatingPoint = {}
+        self.__lock = Lock()
+
+    def __getSteps(self) -> Tuple[int, int]:
+        # Each level either skips one more inference or lowers the JPEG
+        # quality one step, skipping first since inference costs the most
+        maxIntervalSteps = self.__maxDetectInterval - 1
+        maxQualitySteps = (self.__maxQuality - self.__minQuality) // self.__qualityStep
+        intervalSteps = min((self.__level + 1) // 2, maxIntervalSteps)
+        qualitySteps = min(self.__level - intervalSteps, maxQualitySteps)
+        intervalSteps = min(self.__level - qualitySteps, maxIntervalSteps)
+        return intervalSteps, qualitySteps
+
+    def __getMaxLevel(self) -> int:
+        return (
+            self.__maxDetectInterval - 1
+            + (self.__maxQuality - self.__minQuality) // self.__qualityStep
+        )
+
+    def getQuality(self) -> int:
+        return self.__maxQuality - self.__getSteps()[1] * self.__qualityStep
+
+    def getDetectInterval(self) -> int:
+        return 1 + self.__getSteps()[0]
+
+    def pace(self) -> None:
+        # Called before every capture, sleeps until the next frame is due
+        with self.__lock:
+            if self.__pacingFps <= 0:
+                return
+            now = perf_counter()
+            delay = self.__nextFrame - now
+            self.__nextFrame = max(self.__nextFrame, now) + 1 / self.__pacingFps
+        if delay > 0:
+            sleep(delay)
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self.__lock:
+            self.__latency[stage] = self.__latency.get(stage, 0.0) + seconds
+            self.__samples[stage] = self.__samples.get(stage, 0) + 1
+
+    def frameDone(self) -> None:
+        with self.__lock:
+            self.__frames += 1
+            if perf_counter() - self.__windowStart >= self.__window:
+                self.__adjust()
+
+    def __adjust(self) -> None:
+        now = perf_counter()
+        elapsed = now - self.__windowStart
+        fps = self.__frames / elapsed
+        cpu = (process_time() - self.__cpuStart) / elapsed * 100
+        latency = {
+            stage: total / self.__samples[stage]
+            for stage, total in self.__latency.items()
+        }
+        # Time one frame keeps the loop busy, stages overlap in a pipeline.
+        # Capture mostly waits for the camera, none of the knobs shorten it
+        work = [value for stage, value in latency.items() if stage != "capture"]
+        cost = max(work, default=0.0) if self.__pipelined else sum(work)
+
+        overloaded = (
+            (
+                self.__targetFps > 0 and fps < self.__targetFps * 0.9
+                and cost > 0.8 / self.__targetFps
+            )
+            or (self.__cpuBudget > 0 and cpu > self.__cpuBudget)
+        )
+        headroom = (
+            (self.__targetFps <= 0 or cost < 0.6 / self.__targetFps)
+            and (self.__cpuBudget <= 0 or cpu < self.__cpuBudget * 0.8)
+        )
+        if overloaded:
+            if self.__level < self.__getMaxLevel():
+                self.__level += 1
+            elif self.__cpuBudget > 0:
+                # Nothing left to save per frame, process fewer frames
+                self.__pacingFps = max(1.0, fps * 0.8)
+        elif headroom:
+            if 0 < self.__pacingFps and self.__pacingFps != self.__targetFps:
+                # Undo frame pacing first, it was the last resort
+                self.__pacingFps = self.__pacingFps * 1.25
+                if self.__targetFps > 0 and self.__pacingFps >= self.__targetFps:
+                    self.__pacingFps = self.__targetFps
+                elif self.__targetFps <= 0 and fps < self.__pacingFps * 0.8:
+                    # Loop cannot even keep up with the pacing any more
+                    self.__pacingFps = 0
+            elif self.__level > 0:
+                self.__level -= 1
+
+        self.__operatingPoint = {
+            "fps": fps,
+            "pacing": self.__pacingFps,
+            "cpu": cpu,
+            "level": self.__level,
+            "quality": self.getQuality(),
+            "detectInterval": self.getDetectInterval(),
+            "latency": {stage: value * 1000 for stage, value in latency.items()},
+        }
+        self.__latency = {}
+        self.__samples = {}
+        self.__frames = 0
+        self.__windowStart = now
+        self.__cpuStart = process_time()
+
+    def getOperatingPoint(self) -> Dict[str, Any]:
+        with self.__lock:
+            return dict(self.__operatingPoint)
@@ -0,0 +1,170 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from numpy import (
+    argsort, array, bincount, concatenate, empty, float32, full, int32, int64, maximum, minimum,
+    ndarray, ones, zeros,
+)
+
+
+def suppress(boxes: ndarray, scores: ndarray, classIds: ndarray, threshold: float) -> ndarray:
+    # Greedy NMS on all boxes at once, the overlap is the intersection over
+    # the smaller box: a person cut at a tile edge lies inside the whole box
+    # found by the neighbouring tile or the full frame pass
+    if len(boxes) == 0:
+        return zeros(0, dtype=int64)
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = maximum(x2 - x1, 0) * maximum(y2 - y1, 0)
+    width = maximum(minimum(x2[:, None], x2[None, :]) - maximum(x1[:, None], x1[None, :]), 0)
+    height = maximum(minimum(y2[:, None], y2[None, :]) - maximum(y1[:, None], y1[None, :]), 0)
+    overlaps = width * height / maximum(minimum(areas[:, None], areas[None, :]), 1e-6)
+    # Only boxes of the same class suppress each other
+    overlaps[classIds[:, None] != classIds[None, :]] = 0
+
+    order = argsort(-scores, kind="stable")
+    keep = ones(len(boxes), dtype=bool)
+    for index in order:
+        if keep[index]:
+            suppressed = overlaps[index] > threshold
+            suppressed[index] = False
+            keep &= ~suppressed
+    return order[keep[order]]
+
+
+class DetectionBatch:
+
+    # Nx4 x1, y1, x2, y2 in pixels (or 0-1 before scale())
+    boxes: ndarray
+    scores: ndarray
+    # Index into labels
+    classIds: ndarray
+    labels: Tuple[str, ...]
+    # Tracker ids, -1 while untracked
+    ids: ndarray
+    # Zone of every box, None when zones are not used
+    zones: Optional[ndarray]
+
+    def __init__(
+        self,
+        boxes: Any,
+        scores: Any,
+        classIds: Any,
+        labels: Sequence[str],
+        ids: Optional[Any] = None,
+        zones: Optional[Any] = None,
+    ) -> None:
+        self.boxes = array(boxes, dtype=float32).reshape(-1, 4)
+        self.scores = array(scores, dtype=float32).reshape(-1)
+        self.classIds = array(classIds, dtype=int32).reshape(-1)
+        self.labels = tuple(labels)
+        self.ids = full(len(self.boxes), -1, dtype=int64) if ids is None else array(ids, dtype=int64)
+        self.zones = None if zones is None else array(zones, dtype=object).reshape(-1)
+
+    @classmethod
+    def empty(cls, labels: Sequence[str] = ()) -> "DetectionBatch":
+        return cls(empty((0, 4), dtype=float32), [], [], labels)
+
+    @classmethod
+    def fromNames(cls, boxes: Any, scores: Any, names: Sequence[str]) -> "DetectionBatch":
+        # Label table built from whatever names the model returned
+        labels: Dict[str, int] = {}
+        classIds = [labels.setdefault(name, len(labels)) for name in names]
+        return cls(boxes, scores, classIds, list(labels))
+
+    @classmethod
+    def concatenate(cls, batches: Sequence["DetectionBatch"]) -> "DetectionBatch":
+        if len(batches) == 0:
+            return cls.empty()
+        # Label tables are merged, class ids remapped into the merged table
+        labels: Dict[str, int] = {}
+        classIds = []
+        for batch in batches:
+            mapping = array([labels.setdefault(label, len(labels)) for label in batch.labels] or [0])
+            classIds.append(mapping[batch.classIds])
+        zoned = any(batch.zones is not None for batch in batches)
+        return cls(
+            concatenate([batch.boxes for batch in batches]),
+            concatenate([batch.scores for batch in batches]),
+            concatenate(classIds),
+            list(labels),
+            concatenate([batch.ids for batch in batches]),
+            concatenate([
+                batch.zones if batch.zones is not None else full(len(batch), None, dtype=object)
+                for batch in batches
+            ]) if zoned else None,
+        )
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def select(self, index: Any) -> "DetectionBatch":
+        # Boolean mask or index array
+        return DetectionBatch(
+            self.boxes[index],
+            self.scores[index],
+            self.classIds[index],
+            self.labels,
+            self.ids[index],
+            self.zones[index] if self.zones is not None else None,
+        )
+
+    def copy(self) -> "DetectionBatch":
+        return self.select(slice(None))
+
+    def filter(self, labels: Optional[Sequence[str]] = None, minScore: float = 0) -> "DetectionBatch":
+        mask = self.scores >= minScore
+        if labels is not None:
+            wanted = [index for index, label in enumerate(self.labels) if label in labels]
+            mask &= (self.classIds[:, None] == array(wanted, dtype=int32)[None, :]).any(axis=1)
+        return self.select(mask)
+
+    def scale(self, scaleX: float, scaleY: float) -> "DetectionBatch":
+        batch = self.copy()
+        batch.boxes *= array([scaleX, scaleY, scaleX, scaleY], dtype=float32)
+        return batch
+
+    def translate(self, offsetX: float, offsetY: float) -> "DetectionBatch":
+        batch = self.copy()
+        batch.boxes += array([offsetX, offsetY, offsetX, offsetY], dtype=float32)
+        return batch
+
+    def clip(self, width: int, height: int) -> "DetectionBatch":
+        # Whole pixels inside the frame, at least one pixel wide and high
+        batch = self.copy()
+        boxes = batch.boxes.round()
+        boxes[:, 0] = boxes[:, 0].clip(0, width - 1)
+        boxes[:, 1] = boxes[:, 1].clip(0, height - 1)
+        boxes[:, 2] = minimum(maximum(boxes[:, 2], boxes[:, 0] + 1), width)
+        boxes[:, 3] = minimum(maximum(boxes[:, 3], boxes[:, 1] + 1), height)
+        batch.boxes = boxes
+        return batch
+
+    def suppress(self, threshold: float) -> "DetectionBatch":
+        return self.select(suppress(self.boxes, self.scores, self.classIds, threshold))
+
+    def getPixelBoxes(self) -> List[List[int]]:
+        return self.boxes.round().astype(int64).tolist()
+
+    def getLabelNames(self) -> List[str]:
+        return [self.labels[classId] for classId in self.classIds.tolist()]
+
+    def countByLabel(self) -> Dict[str, int]:
+        counts = bincount(self.classIds, minlength=len(self.labels)).tolist()
+        return dict(zip(self.labels, counts))
+
+    def toRecords(self, withLabels: bool = False) -> List[Dict[str, Any]]:
+        # Column by column into plain Python values, ready for json.dumps
+        records = [
+            {"index": index, "x1": x1, "y1": y1, "x2": x2, "y2": y2, "score": score}
+            for index, ((x1, y1, x2, y2), score) in enumerate(
+                zip(self.getPixelBoxes(), self.scores.tolist())
+            )
+        ]
+        if withLabels:
+            for record, label in zip(records, self.getLabelNames()):
+                record["label"] = label
+        for record, trackId in zip(records, self.ids.tolist()):
+            if trackId >= 0:
+                record["id"] = trackId
+        if self.zones is not None:
+            for record, zone in zip(records, self.zones.tolist()):
+                record["zone"] = zone
+        return records
@@ -1,14 +1,63 @@
-from typing import Any, Tuple
-from cv2 import COLOR_BGR2RGBA, FONT_HERSHEY_SIMPLEX, LINE_AA, cvtColor, getTextSize, putText, rectangle
+from collections import deque
+from itertools import count
+from threading import Condition
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from cv2 import COLOR_BGR2RGB, cvtColor, rectangle
 from mediapipe.tasks.python import vision
 from mediapipe.tasks import python as mpPython
 from mediapipe import Image as MpImage, ImageFormat as MpImageFormat
-from numpy import mean
+from numpy import empty, ndarray, uint8
+from detections import DetectionBatch
+from overlay import TextOverlay
+
+
+class RgbConverter:
+
+    __buffers: Dict[Tuple[int, int], ndarray]
+    __maxShapes: int
+
+    def __init__(self, maxShapes: int = 8) -> None:
+        self.__buffers = {}
+        self.__maxShapes = maxShapes
+
+    def convert(self, frame: Any) -> ndarray:
+        # Convert into the same destination every frame instead of allocating
+        # a new RGBA copy, the model takes 3-channel SRGB just as well. Tiles
+        # and zones alternate between a few sizes, each keeps its own buffer
+        shape = frame.shape[:2]
+        buffer = self.__buffers.get(shape)
+        if buffer is None:
+            if len(self.__buffers) >= self.__maxShapes:
+                # Oldest shape first, sizes only change for good on a new camera format
+                del self.__buffers[next(iter(self.__buffers))]
+            buffer = self.__buffers[shape] = empty((*shape, 3), dtype=uint8)
+        cvtColor(frame, COLOR_BGR2RGB, dst=buffer)
+        return buffer
+
+
+def toDetectionBatch(detections: List[Any]) -> DetectionBatch:
+    # One pass over the MediaPipe objects, everything after works on arrays
+    boxes = [
+        (
+            detection.bounding_box.origin_x,
+            detection.bounding_box.origin_y,
+            detection.bounding_box.origin_x + detection.bounding_box.width,
+            detection.bounding_box.origin_y + detection.bounding_box.height,
+        )
+        for detection in detections
+    ]
+    return DetectionBatch.fromNames(
+        boxes,
+        [detection.categories[0].score for detection in detections],
+        [detection.categories[0].category_name for detection in detections],
+    )
 
 
 class Detector:
 
     __detector: Any
+    __overlay: TextOverlay
+    __converter: RgbConverter
 
     def __init__(self, modelPath: str, scoreThreshold: float) -> None:
         options = vision.ObjectDetectorOptions(
@@ -16,14 +65,19 @@ class Detector:
             score_threshold=scoreThreshold,
         )
         self.__detector = vision.ObjectDetector.create_from_options(options)
+        self.__overlay = TextOverlay()
+        self.__converter = RgbConverter()
 
     def getDetections(self, frame: Any) -> Any:
         image = MpImage(
-            image_format=MpImageFormat.SRGBA,
-            data=cvtColor(frame, COLOR_BGR2RGBA),
+            image_format=MpImageFormat.SRGB,
+            data=self.__converter.convert(frame),
         )
         return self.__detector.detect(image).detections
 
+    def getDetectionBatch(self, frame: Any) -> DetectionBatch:
+        return toDetectionBatch(self.getDetections(frame))
+
     def markDetection(
         self,
         image: Any,
@@ -34,19 +88,72 @@ class Detector:
         return image
 
     def setCustomText(self, image: Any, position: Tuple[int, int], text: str) -> Any:
-        x, y = position
+        return self.__overlay.draw(image, position, text)
 
-        for char in text:
-            char_size = getTextSize(char, FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
-            roi = image[y-15:y+char_size[1], x:x+char_size[0]]
-            mean_brightness = mean(roi)
+    def getSize(self) -> int:
+        return 1
 
-            text_color = (0, 0, 0) if mean_brightness > 127 else (
-                255, 255, 255)
+    def close(self) -> None:
+        self.__detector.close()
 
-            putText(image, char, (x, y), FONT_HERSHEY_SIMPLEX,
-                    0.5, text_color, 1, LINE_AA)
 
-            x += char_size[0]
+class DetectorPool:
 
-        return image
+    __detectors: List[Detector]
+    __idle: List[Detector]
+    __waiting: Deque[int]
+    __tickets: Iterator[int]
+    __condition: Condition
+
+    def __init__(self, modelPath: str, scoreThreshold: float, size: int) -> None:
+        self.__detectors = [Detector(modelPath, scoreThreshold) for _ in range(max(1, size))]
+        self.__idle = list(self.__detectors)
+        self.__waiting = deque()
+        self.__tickets = count()
+        self.__condition = Condition()
+
+    def __acquire(self) -> Detector:
+        # Hand out detectors strictly in request order so a fast camera can
+        # not starve the others by asking again right after releasing one
+        with self.__condition:
+            ticket = next(self.__tickets)
+            self.__waiting.append(ticket)
+            self.__condition.wait_for(
+                lambda: self.__waiting[0] == ticket and len(self.__idle) > 0,
+            )
+            self.__waiting.popleft()
+            detector = self.__idle.pop()
+            self.__condition.notify_all()
+            return detector
+
+    def __release(self, detector: Detector) -> None:
+        with self.__condition:
+            self.__idle.append(detector)
+            self.__condition.notify_all()
+
+    def getDetections(self, frame: Any) -> Any:
+        detector = self.__acquire()
+        try:
+            return detector.getDetections(frame)
+        finally:
+            self.__release(detector)
+
+    def getDetectionBatch(self, frame: Any) -> DetectionBatch:
+        return toDetectionBatch(self.getDetections(frame))
+
+    def markDetection(
+        self,
+        image: Any,
+        bounds: tuple[int, int, int, int],
+    ) -> Any:
+        return self.__detectors[0].markDetection(image, bounds)
+
+    def setCustomText(self, image: Any, position: Tuple[int, int], text: str) -> Any:
+        return self.__detectors[0].setCustomText(image, position, text)
+
+    def getSize(self) -> int:
+        return len(self.__detectors)
+
+    def close(self) -> None:
+        for detector in self.__detectors:
+            detector.close()
@@ -0,0 +1,28 @@
+from typing import Any, Dict, List, Optional
+from detections import DetectionBatch
+
+
+class Frame:
+
+    sequence: int
+    timestamp: int
+    image: Any
+    persons: DetectionBatch
+    events: List[Dict[str, Any]]
+    # Tracks active after this frame, taken where the tracker is updated
+    activeIds: List[int]
+    predicted: bool
+    # Overlay drawn onto image
+    rendered: bool
+    jpeg: Optional[bytes]
+
+    def __init__(self, sequence: int, timestamp: int, image: Any) -> None:
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.image = image
+        self.persons = DetectionBatch.empty()
+        self.events = []
+        self.activeIds = []
+        self.predicted = False
+        self.rendered = False
+        self.jpeg = None
@@ -0,0 +1,175 @@
+from bisect import bisect_left
+from threading import Lock, local
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# Seconds, from half a millisecond for a cheap stage up to a stalled camera
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def formatLabels(labels: Dict[str, str]) -> str:
+    if len(labels) == 0:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def formatValue(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Histogram:
+
+    __bounds: Tuple[float, ...]
+    __shards: List[List[float]]
+    __local: local
+    __lock: Lock
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.__bounds = tuple(sorted(bounds))
+        self.__shards = []
+        self.__local = local()
+        self.__lock = Lock()
+
+    def __addShard(self) -> List[float]:
+        # Every recording thread gets its own counts, allocated once, so
+        # observe() needs no lock. Slots are the buckets, +Inf and the sum
+        shard = [0] * (len(self.__bounds) + 2)
+        self.__local.shard = shard
+        with self.__lock:
+            self.__shards.append(shard)
+        return shard
+
+    def observe(self, value: float) -> None:
+        try:
+            shard = self.__local.shard
+        except AttributeError:
+            shard = self.__addShard()
+        shard[bisect_left(self.__bounds, value)] += 1
+        shard[-1] += value
+
+    def getBounds(self) -> Tuple[float, ...]:
+        return self.__bounds
+
+    def getSnapshot(self) -> Tuple[List[int], float]:
+        with self.__lock:
+            shards = list(self.__shards)
+        totals = [sum(values) for values in zip(*shards)] or [0] * (len(self.__bounds) + 2)
+        return [int(count) for count in totals[:-1]], totals[-1]
+
+
+class Counter:
+
+    __value: float
+    __function: Optional[Callable[[], float]]
+    __lock: Lock
+
+    def __init__(self, function: Optional[Callable[[], float]] = None) -> None:
+        self.__value = 0
+        # Value may also be read from elsewhere at scrape time
+        self.__function = function
+        self.__lock = Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self.__lock:
+            self.__value += amount
+
+    def getValue(self) -> float:
+        if self.__function is not None:
+            return self.__function()
+        return self.__value
+
+
+class Gauge(Counter):
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+
+class Metrics:
+
+    __families: Dict[str, Tuple[str, str]]
+    __series: Dict[str, Dict[Tuple[Tuple[str, str], ...], object]]
+    __lock: Lock
+
+    def __init__(self) -> None:
+        self.__families = {}
+        self.__series = {}
+        self.__lock = Lock()
+
+    def __getSeries(
+        self,
+        kind: str,
+        name: str,
+        help: str,
+        labels: Dict[str, str],
+        create: Callable[[], object],
+    ) -> object:
+        key = tuple(sorted(labels.items()))
+        with self.__lock:
+            family = self.__families.setdefault(name, (kind, help))
+            if family[0] != kind:
+                raise ValueError(f"metric {name} is already registered as a {family[0]}")
+            series = self.__series.setdefault(name, {})
+            if key not in series:
+                series[key] = create()
+            return series[key]
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Dict[str, str] = {},
+        bounds: Tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.__getSeries("histogram", name, help, labels, lambda: Histogram(bounds))
+
+    def counter(
+        self,
+        name: str,
+        help: str,
+        labels: Dict[str, str] = {},
+        function: Optional[Callable[[], float]] = None,
+    ) -> Counter:
+        return self.__getSeries("counter", name, help, labels, lambda: Counter(function))
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        labels: Dict[str, str] = {},
+        function: Optional[Callable[[], float]] = None,
+    ) -> Gauge:
+        return self.__getSeries("gauge", name, help, labels, lambda: Gauge(function))
+
+    def render(self) -> str:
+        # Prometheus text exposition format
+        with self.__lock:
+            families = list(self.__families.items())
+            series = {name: list(self.__series[name].items()) for name, _ in families}
+
+        lines: List[str] = []
+        for name, (kind, help) in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, metric in series[name]:
+                labels = dict(key)
+                if isinstance(metric, Histogram):
+                    counts, total = metric.getSnapshot()
+                    cumulative = 0
+                    for bound, count in zip(metric.getBounds() + (float("inf"),), counts):
+                        cumulative += count
+                        bucketLabels = formatLabels({
+                            **labels, "le": "+Inf" if bound == float("inf") else repr(float(bound)),
+                        })
+                        lines.append(f"{name}_bucket{bucketLabels} {cumulative}")
+                    lines.append(f"{name}_sum{formatLabels(labels)} {formatValue(total)}")
+                    lines.append(f"{name}_count{formatLabels(labels)} {cumulative}")
+                else:
+                    lines.append(f"{name}{formatLabels(labels)} {formatValue(metric.getValue())}")
+        return "\n".join(lines) + "\n"
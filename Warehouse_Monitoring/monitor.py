@@ -0,0 +1,527 @@
+from base64 import b64encode
+from itertools import count
+from json import dumps
+from threading import Lock
+from time import localtime, perf_counter, strftime, time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
+from cv2 import INTER_AREA, IMWRITE_JPEG_QUALITY, imencode, resize
+from numpy import array, int64
+from buffer import Buffer
+from controller import RateController
+from detections import DetectionBatch
+from detector import Detector, DetectorPool
+from workers import ProcessDetector
+from zones import ZoneDetector
+from frame import Frame
+from metrics import Counter, Histogram, Metrics
+from motion import MotionGate
+from recorder import ClipRecorder
+from tiles import TileDetector
+from tracker import Tracker
+from video import Video
+
+
+class Monitor:
+
+    __name: str
+    __video: Video
+    __detector: Union[Detector, DetectorPool, ProcessDetector]
+    __buffer: Buffer
+    __mqttClient: Any
+    __description: str
+    __width: int
+    __height: int
+    __mqttTopic: str
+    __mqttImageTopic: str
+    __publishMode: str
+    __sequence: Iterator[int]
+    __motionGate: Optional[MotionGate]
+    __zones: Optional[ZoneDetector]
+    __tiles: Optional[TileDetector]
+    __tracker: Optional[Tracker]
+    __events: bool
+    __eventTopic: str
+    __heartbeatInterval: float
+    __lastHeartbeat: int
+    __detectInterval: int
+    __redetectScore: float
+    __redetectOnChange: bool
+    __sinceDetection: int
+    __redetect: bool
+    __detectedFrames: int
+    __predictedFrames: int
+    __controller: Optional[RateController]
+    __histograms: Dict[str, Histogram]
+    __framesProcessed: Optional[Counter]
+    __framesDropped: Optional[Counter]
+    __bytesPublished: Optional[Counter]
+    __lastPersons: DetectionBatch
+    __streamHeight: int
+    __mqttImageHeight: int
+    __viewers: Optional[Callable[[], int]]
+    __recorder: Optional[ClipRecorder]
+    __lastFrame: Optional[Frame]
+    __snapshot: Optional[bytes]
+    __snapshotLock: Lock
+    __overlayLock: Lock
+    __lock: Lock
+
+    def __init__(
+        self,
+        video: Video,
+        detector: Union[Detector, DetectorPool, ProcessDetector],
+        buffer: Buffer,
+        mqttClient: Any,
+        description: str,
+        width: int,
+        height: int,
+        mqttTopic: str,
+        mqttImageTopic: str,
+        publishMode: str,
+    ) -> None:
+        self.__name = ""
+        self.__video = video
+        self.__detector = detector
+        self.__buffer = buffer
+        self.__mqttClient = mqttClient
+        self.__description = description
+        self.__width = width
+        self.__height = height
+        self.__mqttTopic = mqttTopic
+        self.__mqttImageTopic = mqttImageTopic
+        self.__publishMode = publishMode
+        self.__sequence = count()
+        self.__motionGate = None
+        self.__zones = None
+        self.__tiles = None
+        self.__tracker = None
+        self.__events = False
+        self.__eventTopic = ""
+        self.__heartbeatInterval = 0
+        self.__lastHeartbeat = 0
+        self.__detectInterval = 1
+        self.__redetectScore = 0
+        self.__redetectOnChange = False
+        self.__sinceDetection = 0
+        # Nothing to predict from until the first detection
+        self.__redetect = True
+        self.__detectedFrames = 0
+        self.__predictedFrames = 0
+        self.__controller = None
+        self.__histograms = {}
+        self.__framesProcessed = None
+        self.__framesDropped = None
+        self.__bytesPublished = None
+        self.__lastPersons = DetectionBatch.empty()
+        self.__streamHeight = 0
+        self.__mqttImageHeight = 0
+        self.__viewers = None
+        self.__recorder = None
+        self.__lastFrame = None
+        self.__snapshot = None
+        self.__snapshotLock = Lock()
+        self.__overlayLock = Lock()
+        self.__lock = Lock()
+
+    def setName(self, name: str) -> None:
+        self.__name = name
+
+    def getName(self) -> str:
+        return self.__name
+
+    def setMotionGate(self, motionGate: Optional[MotionGate]) -> None:
+        self.__motionGate = motionGate
+
+    def setZones(self, zones: Optional[ZoneDetector]) -> None:
+        self.__zones = zones
+
+    def setTiles(self, tiles: Optional[TileDetector]) -> None:
+        # Zones take precedence, their crops are already close ups
+        self.__tiles = tiles
+
+    def setTracker(self, tracker: Optional[Tracker]) -> None:
+        self.__tracker = tracker
+
+    def setEvents(self, eventTopic: str, heartbeatInterval: float) -> None:
+        # Needs a tracker, events are raised by it
+        self.__events = True
+        self.__eventTopic = eventTopic
+        self.__heartbeatInterval = heartbeatInterval
+
+    def setDetectInterval(
+        self,
+        detectInterval: int,
+        redetectScore: float,
+        redetectOnChange: bool,
+    ) -> None:
+        # Needs a tracker, boxes between two detections are predicted by it
+        self.__detectInterval = max(1, detectInterval)
+        self.__redetectScore = redetectScore
+        self.__redetectOnChange = redetectOnChange
+
+    def hasTracker(self) -> bool:
+        return self.__tracker is not None
+
+    def setRenditions(self, streamHeight: int, mqttImageHeight: int) -> None:
+        # 0 keeps the captured size
+        self.__streamHeight = streamHeight
+        self.__mqttImageHeight = mqttImageHeight
+
+    def setViewers(self, viewers: Optional[Callable[[], int]]) -> None:
+        # Number of stream viewers ready for a new frame. The stream is
+        # neither drawn nor encoded while it is 0, with nobody watching or
+        # every viewer still busy with an earlier frame, so it is encoded at
+        # most as fast as the fastest viewer takes it
+        self.__viewers = viewers
+
+    def setRecorder(self, recorder: Optional[ClipRecorder]) -> None:
+        # Records the stream rendition, so it is encoded even without viewers
+        self.__recorder = recorder
+
+    def setController(self, controller: Optional[RateController]) -> None:
+        self.__controller = controller
+
+    def setMetrics(self, metrics: Metrics) -> None:
+        # Series are labelled with the camera name, set it first
+        for stage in ("capture", "inference", "overlay", "encode", "serialize", "mqtt"):
+            self.__histograms[stage] = metrics.histogram(
+                "warehouse_stage_seconds",
+                "Time spent per frame in each processing step",
+                {"camera": self.__name, "stage": stage},
+            )
+        self.__framesProcessed = metrics.counter(
+            "warehouse_frames_processed_total",
+            "Frames that went through the whole loop",
+            {"camera": self.__name},
+        )
+        self.__framesDropped = metrics.counter(
+            "warehouse_frames_dropped_total",
+            "Frames lost before they were published",
+            {"camera": self.__name, "reason": "capture"},
+        )
+        self.__bytesPublished = metrics.counter(
+            "warehouse_mqtt_published_bytes_total",
+            "Payload bytes handed to the MQTT client",
+            {"camera": self.__name},
+        )
+
+    def __record(self, stage: str, startTime: float) -> None:
+        if self.__controller is not None:
+            self.__controller.record(stage, perf_counter() - startTime)
+
+    def __observe(self, stage: str, startTime: float) -> float:
+        # Returns the current time so consecutive steps can be chained
+        now = perf_counter()
+        histogram = self.__histograms.get(stage)
+        if histogram is not None:
+            histogram.observe(now - startTime)
+        return now
+
+    def __send(self, topic: str, payload: Union[str, bytes]) -> None:
+        startTime = perf_counter()
+        self.__mqttClient.publish(topic, payload)
+        self.__observe("mqtt", startTime)
+        if self.__bytesPublished is not None:
+            self.__bytesPublished.inc(len(payload))
+
+    def capture(self) -> Optional[Frame]:
+        if self.__controller is not None:
+            self.__controller.pace()
+        startTime = perf_counter()
+        currentTime = round(time() * 1000)
+        videoFrame = self.__video.capture()
+        self.__record("capture", startTime)
+        self.__observe("capture", startTime)
+        if videoFrame is None:
+            if self.__framesDropped is not None:
+                self.__framesDropped.inc()
+            return None
+        return Frame(next(self.__sequence), currentTime, videoFrame)
+
+    def __shouldSkip(self) -> bool:
+        # Skip inference between two detections, unless the last detection
+        # asked for an early one. The controller may skip more under load
+        detectInterval = self.__detectInterval
+        if self.__controller is not None:
+            detectInterval = max(detectInterval, self.__controller.getDetectInterval())
+        if self.__redetect:
+            return False
+        self.__sinceDetection += 1
+        if self.__sinceDetection >= detectInterval:
+            self.__sinceDetection = 0
+            return False
+        return True
+
+    def detect(self, frame: Frame) -> Frame:
+        startTime = perf_counter()
+        frame = self.__detect(frame)
+        self.__record("detect", startTime)
+        return frame
+
+    def __detect(self, frame: Frame) -> Frame:
+        # Several inference workers may call this concurrently, neither the
+        # interval counter nor the gate is thread safe
+        with self.__lock:
+            if self.__shouldSkip():
+                # The tracker predicts the boxes later on, without one the
+                # last detection is held over
+                if self.__tracker is not None:
+                    frame.predicted = True
+                else:
+                    frame.persons = self.__lastPersons.copy()
+                self.__predictedFrames += 1
+                return frame
+            self.__sinceDetection = 0
+            self.__redetect = False
+
+            # Static scene, reuse what the last detection found
+            if self.__motionGate is not None and not self.__motionGate.shouldDetect(frame.image):
+                frame.persons = self.__lastPersons.copy()
+                return frame
+            self.__detectedFrames += 1
+
+        # Only the zone crops go through the model when zones are configured
+        source = self.__zones or self.__tiles or self.__detector
+
+        # Filter out all non-person detections
+        startTime = perf_counter()
+        detections = source.getDetectionBatch(frame.image)
+        self.__observe("inference", startTime)
+        frame.persons = self.__assignZones(detections.filter(["person"]))
+        with self.__lock:
+            if self.__redetectScore > 0 and (frame.persons.scores < self.__redetectScore).any():
+                self.__redetect = True
+            if self.__redetectOnChange and len(frame.persons) != len(self.__lastPersons):
+                self.__redetect = True
+            self.__lastPersons = frame.persons
+        return frame
+
+    def __assignZones(self, persons: DetectionBatch) -> DetectionBatch:
+        if self.__zones is None:
+            return persons
+        # Persons outside every zone must not raise an alert
+        zones = [self.__zones.getZone(tuple(box)) for box in persons.getPixelBoxes()]
+        persons.zones = array(zones, dtype=object)
+        return persons.select([index for index, zone in enumerate(zones) if zone is not None])
+
+    def __predict(self, frame: Frame) -> Frame:
+        frameHeight, frameWidth = frame.image.shape[:2]
+        ids, boxes, scores = self.__tracker.predict(frame.timestamp)
+        persons = DetectionBatch(boxes, scores, [0] * len(ids), ["person"], ids)
+        frame.persons = self.__assignZones(persons.clip(frameWidth, frameHeight))
+        return frame
+
+    def track(self, frame: Frame) -> Frame:
+        # Must see frames in capture order, so it runs after the (possibly
+        # parallel) inference step
+        if self.__tracker is None:
+            return frame
+        if frame.predicted:
+            # The publish step may run on another thread while the next frame
+            # updates the tracker, it only reads this copy
+            frame.activeIds = self.__tracker.getActiveIds()
+            return self.__predict(frame)
+        ids, frame.events = self.__tracker.update(
+            frame.persons.boxes,
+            frame.timestamp,
+            frame.persons.scores,
+        )
+        frame.persons.ids = array(ids, dtype=int64).reshape(-1)
+        zones: Dict[int, Any] = {}
+        if frame.persons.zones is not None:
+            zones = dict(zip(ids, frame.persons.zones.tolist()))
+        for event in frame.events:
+            if event["id"] in zones:
+                event["zone"] = zones[event["id"]]
+        frame.activeIds = self.__tracker.getActiveIds()
+        return frame
+
+    def render(self, frame: Frame) -> Frame:
+        startTime = perf_counter()
+        # Full resolution is only encoded when a snapshot is requested
+        with self.__snapshotLock:
+            self.__lastFrame = frame
+            self.__snapshot = None
+
+        # Without viewers the overlay is left to a snapshot request or an
+        # outgoing MQTT image, it is drawn only as often as one asks for it
+        if self.__recorder is not None or self.__viewers is None or self.__viewers() > 0:
+            image = self.__drawOverlay(frame)
+            encodeTime = perf_counter()
+            frame.jpeg = self.__encode(image, self.__streamHeight)
+            self.__observe("encode", encodeTime)
+        self.__record("encode", startTime)
+        return frame
+
+    def __drawOverlay(self, frame: Frame) -> Any:
+        # Drawn at most once per frame, whichever consumer comes first
+        with self.__overlayLock:
+            if frame.rendered:
+                return frame.image
+            return self.__render(frame)
+
+    def __render(self, frame: Frame) -> Any:
+        startTime = perf_counter()
+        videoFrame = frame.image
+        if self.__zones is not None:
+            videoFrame = self.__zones.markZones(videoFrame)
+        for box in frame.persons.getPixelBoxes():
+            videoFrame = self.__detector.markDetection(videoFrame, tuple(box))
+
+        # Add timestamp to image
+        currentTimeObj = localtime(frame.timestamp/1000)
+        self.__detector.setCustomText(
+            videoFrame,
+            (10, 20),
+            f"{strftime('%Y-%m-%d %H:%M:%S', currentTimeObj)} {currentTimeObj.tm_zone}",
+        )
+
+        # Add description to image
+        self.__detector.setCustomText(
+            videoFrame,
+            (10, 40),
+            self.__description
+        )
+        frame.image = videoFrame
+        frame.rendered = True
+        self.__observe("overlay", startTime)
+        return videoFrame
+
+    def __getSize(self, image: Any, height: int) -> Tuple[int, int]:
+        imageHeight, imageWidth = image.shape[:2]
+        if height <= 0 or height >= imageHeight:
+            return imageWidth, imageHeight
+        return max(1, round(imageWidth * height / imageHeight)), height
+
+    def __encode(self, image: Any, height: int) -> bytes:
+        width, height = self.__getSize(image, height)
+        if height != image.shape[0]:
+            image = resize(image, (width, height), interpolation=INTER_AREA)
+        if self.__controller is not None:
+            _, buffer = imencode(
+                ".jpeg", image, [IMWRITE_JPEG_QUALITY, self.__controller.getQuality()],
+            )
+        else:
+            _, buffer = imencode(".jpeg", image)
+        return buffer.tobytes()
+
+    def getSnapshot(self) -> Optional[bytes]:
+        # Encoded once per frame at most, however many requests come in
+        with self.__snapshotLock:
+            frame, snapshot = self.__lastFrame, self.__snapshot
+        if snapshot is not None or frame is None:
+            return snapshot
+        _, buffer = imencode(".jpeg", self.__drawOverlay(frame))
+        snapshot = buffer.tobytes()
+        with self.__snapshotLock:
+            if self.__lastFrame is frame:
+                self.__snapshot = snapshot
+        return snapshot
+
+    def __publishEvents(self, frame: Frame) -> bool:
+        for event in frame.events:
+            self.__send(
+                self.__eventTopic,
+                dumps({**event, "sequence": frame.sequence}, separators=(",", ":")),
+            )
+
+        heartbeatDue = frame.timestamp - self.__lastHeartbeat >= self.__heartbeatInterval * 1000
+        if heartbeatDue:
+            self.__lastHeartbeat = frame.timestamp
+            self.__send(self.__eventTopic, dumps({
+                "type": "heartbeat",
+                "sequence": frame.sequence,
+                "timestamp": frame.timestamp,
+                "count": len(frame.persons),
+                "ids": frame.activeIds,
+            }, separators=(",", ":")))
+        return heartbeatDue or len(frame.events) > 0
+
+    def publish(self, frame: Frame) -> None:
+        startTime = perf_counter()
+        self.__publish(frame)
+        self.__record("publish", startTime)
+        if self.__framesProcessed is not None:
+            self.__framesProcessed.inc()
+        if self.__controller is not None:
+            self.__controller.frameDone()
+
+    def __publish(self, frame: Frame) -> None:
+        # Add image to buffer, unless nobody was watching
+        if frame.jpeg is not None:
+            self.__buffer.setData(frame.jpeg)
+        if self.__recorder is not None:
+            self.__recorder.addFrame(frame.timestamp, frame.jpeg, len(frame.persons))
+
+        # With a tracker the full message only goes out when something changed
+        # or with the heartbeat, instead of for every frame
+        if self.__events and not self.__publishEvents(frame):
+            return
+
+        # The MQTT snapshot is only encoded once a message is going out
+        if frame.jpeg is not None and self.__mqttImageHeight == self.__streamHeight:
+            jpeg = frame.jpeg
+        else:
+            image = self.__drawOverlay(frame)
+            startTime = perf_counter()
+            jpeg = self.__encode(image, self.__mqttImageHeight)
+            self.__observe("encode", startTime)
+        width, height = self.__getSize(frame.image, self.__mqttImageHeight)
+
+        startTime = perf_counter()
+        payload = {
+            "sequence": frame.sequence,
+            "timestamp": frame.timestamp,
+            "persons": {
+                "count": len(frame.persons),
+                "data": frame.persons.toRecords()
+            },
+            "alert": len(frame.persons) > 0,
+            "predicted": frame.predicted,
+        }
+
+        if self.__publishMode == "split":
+            # Raw JPEG goes out on its own topic, the detection message only
+            # references it by sequence number so subscribers that just need
+            # the counts never have to parse the image
+            payload["snapshot"] = {
+                "topic": self.__mqttImageTopic,
+                "sequence": frame.sequence,
+                "width": width,
+                "height": height,
+            }
+        else:
+            # Send message to MQTT server with base64 encoded image
+            snapshot = b64encode(jpeg).decode("utf-8")
+            payload["snapshot"] = {
+                "image": f"data:image/jpeg;base64,{snapshot}",
+                "width": width,
+                "height": height,
+            }
+        message = dumps(payload, separators=(",", ":"))
+        self.__observe("serialize", startTime)
+        if self.__publishMode == "split":
+            self.__send(self.__mqttImageTopic, jpeg)
+        self.__send(self.__mqttTopic, message)
+
+    def process(self) -> bool:
+        frame = self.capture()
+        if frame is None:
+            return False
+        self.publish(self.render(self.track(self.detect(frame))))
+        return True
+
+    def getStats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"video": self.__video.getStats()}
+        if self.__motionGate is not None:
+            stats["inference"] = self.__motionGate.getStats()
+        if self.__controller is not None:
+            stats["controller"] = self.__controller.getOperatingPoint()
+        if self.__recorder is not None:
+            stats["recorder"] = self.__recorder.getStats()
+        if self.__detectInterval > 1 or self.__controller is not None:
+            stats["frames"] = {
+                "detected": self.__detectedFrames,
+                "predicted": self.__predictedFrames,
+            }
+        return stats
@@ -0,0 +1,67 @@
+from typing import Any, Dict, Optional
+from cv2 import COLOR_BGR2GRAY, INTER_AREA, absdiff, accumulateWeighted, convertScaleAbs, countNonZero, cvtColor, resize, threshold, THRESH_BINARY
+from numpy import float32, ndarray
+
+
+class MotionGate:
+
+    __threshold: float
+    __downscale: int
+    __maxSkip: int
+    __pixelDelta: int
+    __learningRate: float
+    __background: Optional[ndarray]
+    __consecutiveSkips: int
+    __executed: int
+    __skipped: int
+
+    def __init__(
+        self,
+        threshold: float,
+        downscale: int,
+        maxSkip: int,
+        pixelDelta: int = 25,
+        learningRate: float = 0.25,
+    ) -> None:
+        self.__threshold = threshold
+        self.__downscale = max(1, downscale)
+        self.__maxSkip = maxSkip
+        self.__pixelDelta = pixelDelta
+        self.__learningRate = learningRate
+        self.__background = None
+        self.__consecutiveSkips = 0
+        self.__executed = 0
+        self.__skipped = 0
+
+    def getMotion(self, frame: Any) -> float:
+        # Fraction of pixels that differ from the running background model,
+        # measured on a downscaled greyscale copy of the frame
+        small = resize(
+            frame, None,
+            fx=1 / self.__downscale, fy=1 / self.__downscale,
+            interpolation=INTER_AREA,
+        )
+        gray = cvtColor(small, COLOR_BGR2GRAY) if small.ndim == 3 else small
+        if self.__background is None or self.__background.shape != gray.shape:
+            self.__background = gray.astype(float32)
+            return 1.0
+
+        diff = absdiff(gray, convertScaleAbs(self.__background))
+        _, changed = threshold(diff, self.__pixelDelta, 255, THRESH_BINARY)
+        accumulateWeighted(gray, self.__background, self.__learningRate)
+        return countNonZero(changed) / changed.size
+
+    def shouldDetect(self, frame: Any) -> bool:
+        moving = self.getMotion(frame) >= self.__threshold
+        # Force a keyframe detection every so often even if nothing moves, so
+        # a person standing still is not reported forever after leaving
+        if moving or self.__consecutiveSkips >= self.__maxSkip:
+            self.__consecutiveSkips = 0
+            self.__executed += 1
+            return True
+        self.__consecutiveSkips += 1
+        self.__skipped += 1
+        return False
+
+    def getStats(self) -> Dict[str, int]:
+        return {"executed": self.__executed, "skipped": self.__skipped}
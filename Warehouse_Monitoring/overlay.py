@@ -0,0 +1,164 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Tuple
+from cv2 import FONT_HERSHEY_SIMPLEX, LINE_AA, getTextSize, integral, putText
+from numpy import add, array, clip, float32, full, int32, nan, ndarray, repeat, uint8, zeros
+
+
+class TextMask:
+
+    alpha: ndarray
+    baselineRow: int
+    offsets: ndarray
+    widths: ndarray
+    heights: ndarray
+
+    def __init__(
+        self,
+        alpha: ndarray,
+        baselineRow: int,
+        offsets: ndarray,
+        widths: ndarray,
+        heights: ndarray,
+    ) -> None:
+        self.alpha = alpha
+        self.baselineRow = baselineRow
+        self.offsets = offsets
+        self.widths = widths
+        self.heights = heights
+
+
+class TextOverlay:
+
+    __fontFace: int
+    __fontScale: float
+    __thickness: int
+    __sampleAbove: int
+    __glyphs: Dict[str, Tuple[int, int, int]]
+    __masks: "OrderedDict[str, TextMask]"
+    __maxMasks: int
+    __lock: Lock
+
+    def __init__(
+        self,
+        fontFace: int = FONT_HERSHEY_SIMPLEX,
+        fontScale: float = 0.5,
+        thickness: int = 1,
+        sampleAbove: int = 15,
+        maxMasks: int = 8,
+    ) -> None:
+        self.__fontFace = fontFace
+        self.__fontScale = fontScale
+        self.__thickness = thickness
+        self.__sampleAbove = sampleAbove
+        self.__glyphs = {}
+        self.__masks = OrderedDict()
+        self.__maxMasks = maxMasks
+        self.__lock = Lock()
+
+    def __getGlyph(self, char: str) -> Tuple[int, int, int]:
+        glyph = self.__glyphs.get(char)
+        if glyph is None:
+            (width, height), baseline = getTextSize(
+                char, self.__fontFace, self.__fontScale, self.__thickness,
+            )
+            glyph = (width, height, baseline)
+            self.__glyphs[char] = glyph
+        return glyph
+
+    def __getMask(self, text: str) -> TextMask:
+        mask = self.__masks.get(text)
+        if mask is not None:
+            self.__masks.move_to_end(text)
+            return mask
+
+        glyphs = array([self.__getGlyph(char) for char in text], dtype=int32)
+        widths, heights, baselines = glyphs[:, 0], glyphs[:, 1], glyphs[:, 2]
+        offsets = add.accumulate(widths) - widths
+
+        # Leave a couple of pixels around the glyphs for anti-aliasing
+        baselineRow = int(heights.max()) + 2
+        canvas = zeros(
+            (baselineRow + int(baselines.max()) + 2, int(widths.sum()) + 2),
+            dtype=uint8,
+        )
+        for char, offset in zip(text, offsets):
+            putText(canvas, char, (int(offset), baselineRow), self.__fontFace,
+                    self.__fontScale, 255, self.__thickness, LINE_AA)
+
+        mask = TextMask(
+            (canvas.astype(float32) / 255)[:, :, None],
+            baselineRow,
+            offsets,
+            widths,
+            heights,
+        )
+        self.__masks[text] = mask
+        if len(self.__masks) > self.__maxMasks:
+            self.__masks.popitem(last=False)
+        return mask
+
+    def __getBrightness(self, image: Any, position: Tuple[int, int], mask: TextMask) -> ndarray:
+        # Mean brightness of the area behind every character, computed from a
+        # single integral image of the text band
+        x, y = position
+        imageHeight, imageWidth = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+
+        top = min(max(y - self.__sampleAbove, 0), imageHeight)
+        bottom = min(max(y + int(mask.heights.max()), top), imageHeight)
+        left = min(max(x, 0), imageWidth)
+        right = min(max(x + int(mask.widths.sum()), left), imageWidth)
+        if bottom == top or right == left:
+            return full(len(mask.widths), nan)
+
+        band = integral(image[top:bottom, left:right])
+        rowStart = 0
+        rowEnd = clip(y + mask.heights, top, bottom) - top
+        colStart = clip(x + mask.offsets, left, right) - left
+        colEnd = clip(x + mask.offsets + mask.widths, left, right) - left
+
+        sums = (
+            band[rowEnd, colEnd] - band[rowStart, colEnd]
+            - band[rowEnd, colStart] + band[rowStart, colStart]
+        )
+        if sums.ndim == 2:
+            sums = sums.sum(axis=1)
+        areas = (rowEnd - rowStart) * (colEnd - colStart) * channels
+        brightness = full(len(areas), nan)
+        visible = areas > 0
+        brightness[visible] = sums[visible] / areas[visible]
+        return brightness
+
+    def draw(self, image: Any, position: Tuple[int, int], text: str) -> Any:
+        if len(text) == 0:
+            return image
+
+        x, y = position
+        # Several cameras may share one overlay
+        with self.__lock:
+            mask = self.__getMask(text)
+        imageHeight, imageWidth = image.shape[:2]
+
+        # Black text over bright background, white otherwise
+        brightness = self.__getBrightness(image, position, mask)
+        charColors = (~(brightness > 127)).astype(float32) * 255
+        columnColors = full(mask.alpha.shape[1], charColors[-1], dtype=float32)
+        columnColors[:int(mask.widths.sum())] = repeat(charColors, mask.widths)
+
+        # Clip the mask against the image borders
+        maskTop = y - mask.baselineRow
+        rowStart, rowEnd = max(maskTop, 0), min(maskTop + mask.alpha.shape[0], imageHeight)
+        colStart, colEnd = max(x, 0), min(x + mask.alpha.shape[1], imageWidth)
+        if rowEnd <= rowStart or colEnd <= colStart:
+            return image
+
+        alpha = mask.alpha[rowStart - maskTop:rowEnd - maskTop, colStart - x:colEnd - x]
+        colors = columnColors[colStart - x:colEnd - x][None, :, None]
+        region = image[rowStart:rowEnd, colStart:colEnd]
+        if region.ndim == 2:
+            alpha, colors = alpha[:, :, 0], colors[:, :, 0]
+
+        blended = region + (colors - region) * alpha
+        region[...] = (blended + 0.5).astype(uint8)
+        return image
@@ -0,0 +1,234 @@
+from logging import Logger
+from queue import Empty, Full, Queue
+from threading import Condition, Event, Lock, Thread
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+
+class StageQueue:
+
+    __queue: Queue
+    __dropPolicy: str
+    __dropCount: int
+    __lock: Lock
+
+    def __init__(self, maxSize: int, dropPolicy: str) -> None:
+        if dropPolicy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"unknown drop policy: {dropPolicy}")
+        self.__queue = Queue(maxsize=max(1, maxSize))
+        self.__dropPolicy = dropPolicy
+        self.__dropCount = 0
+        self.__lock = Lock()
+
+    def put(self, item: Any, stopEvent: Event) -> None:
+        while not stopEvent.is_set():
+            if self.__dropPolicy == BLOCK:
+                try:
+                    self.__queue.put(item, timeout=0.1)
+                    return
+                except Full:
+                    continue
+            try:
+                self.__queue.put_nowait(item)
+                return
+            except Full:
+                # Make room by discarding the stalest item, the consumer only
+                # cares about the most recent frames
+                try:
+                    self.__queue.get_nowait()
+                    with self.__lock:
+                        self.__dropCount += 1
+                except Empty:
+                    pass
+
+    def get(self, timeout: float) -> Any:
+        return self.__queue.get(timeout=timeout)
+
+    def getDepth(self) -> int:
+        return self.__queue.qsize()
+
+    def getCapacity(self) -> int:
+        return self.__queue.maxsize
+
+    def getDropCount(self) -> int:
+        return self.__dropCount
+
+
+class Stage:
+
+    __name: str
+    __handler: Callable[[Any], Any]
+    __input: Optional[StageQueue]
+    __output: Optional[StageQueue]
+    __workers: int
+    __processed: int
+    __errors: int
+    __busyTime: float
+    __logger: Optional[Logger]
+    __inputLock: Lock
+    __nextTicket: int
+    __orderCondition: Condition
+    __nextEmit: int
+    __finished: Dict[int, Any]
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Any],
+        input: Optional[StageQueue],
+        output: Optional[StageQueue],
+        workers: int = 1,
+        logger: Optional[Logger] = None,
+    ) -> None:
+        self.__name = name
+        self.__handler = handler
+        self.__input = input
+        self.__output = output
+        self.__workers = workers
+        self.__processed = 0
+        self.__errors = 0
+        self.__busyTime = 0.0
+        self.__logger = logger
+        self.__inputLock = Lock()
+        self.__nextTicket = 0
+        self.__orderCondition = Condition()
+        self.__nextEmit = 0
+        self.__finished = {}
+
+    def getName(self) -> str:
+        return self.__name
+
+    def getWorkers(self) -> int:
+        return self.__workers
+
+    def __emit(self, ticket: int, result: Any, stopEvent: Event) -> None:
+        # Workers may finish out of order, hand results on in the order their
+        # items were taken from the input queue
+        with self.__orderCondition:
+            self.__finished[ticket] = result
+            while self.__nextEmit in self.__finished:
+                result = self.__finished.pop(self.__nextEmit)
+                self.__nextEmit += 1
+                # Handlers return None to discard the item (e.g. failed capture)
+                if result is not None and self.__output is not None:
+                    self.__output.put(result, stopEvent)
+
+    def run(self, stopEvent: Event) -> None:
+        while not stopEvent.is_set():
+            with self.__inputLock:
+                if self.__input is None:
+                    item = None
+                else:
+                    try:
+                        item = self.__input.get(timeout=0.1)
+                    except Empty:
+                        continue
+                ticket = self.__nextTicket
+                self.__nextTicket += 1
+
+            startTime = perf_counter()
+            try:
+                result = self.__handler(item) if self.__input is not None else self.__handler()
+            except Exception:
+                # The ticket must still be emitted, or every later item waits
+                # for it forever
+                result = None
+                with self.__inputLock:
+                    self.__errors += 1
+                if self.__logger is not None:
+                    self.__logger.exception(f"pipeline stage {self.__name} failed")
+            busyTime = perf_counter() - startTime
+            with self.__inputLock:
+                self.__busyTime += busyTime
+                self.__processed += 1
+
+            self.__emit(ticket, result, stopEvent)
+
+    def getStats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "name": self.__name,
+            "processed": self.__processed,
+            "errors": self.__errors,
+            "busy": self.__busyTime,
+        }
+        if self.__input is not None:
+            stats["depth"] = self.__input.getDepth()
+            stats["capacity"] = self.__input.getCapacity()
+            stats["dropped"] = self.__input.getDropCount()
+        return stats
+
+
+class Pipeline:
+
+    __queueSize: int
+    __dropPolicy: str
+    __handlers: List[Tuple[str, Callable, int]]
+    __stages: List[Stage]
+    __threads: List[Thread]
+    __stopEvent: Event
+    __logger: Optional[Logger]
+
+    def __init__(self, queueSize: int, dropPolicy: str, logger: Optional[Logger] = None) -> None:
+        self.__queueSize = queueSize
+        self.__dropPolicy = dropPolicy
+        self.__logger = logger
+        self.__handlers = []
+        self.__stages = []
+        self.__threads = []
+        self.__stopEvent = Event()
+
+    def addSource(self, name: str, producer: Callable[[], Any]) -> None:
+        if len(self.__handlers) != 0:
+            raise ValueError("pipeline source must be added first")
+        self.__handlers.append((name, producer, 1))
+
+    def addStage(self, name: str, handler: Callable[[Any], Any], workers: int = 1) -> None:
+        if len(self.__handlers) == 0:
+            raise ValueError("pipeline source must be added first")
+        self.__handlers.append((name, handler, max(1, workers)))
+
+    def start(self) -> None:
+        if len(self.__handlers) == 0:
+            raise ValueError("pipeline has no stages")
+
+        # Stages are chained by bounded queues, the source has no input and
+        # the last stage has no output
+        queues = [
+            StageQueue(self.__queueSize, self.__dropPolicy)
+            for _ in range(len(self.__handlers) - 1)
+        ]
+        for index, (name, handler, workers) in enumerate(self.__handlers):
+            self.__stages.append(Stage(
+                name,
+                handler,
+                queues[index - 1] if index > 0 else None,
+                queues[index] if index < len(queues) else None,
+                workers,
+                self.__logger,
+            ))
+
+        for stage in self.__stages:
+            for worker in range(stage.getWorkers()):
+                thread = Thread(
+                    target=stage.run,
+                    args=(self.__stopEvent,),
+                    name=f"pipeline-{stage.getName()}-{worker}",
+                    daemon=True,
+                )
+                thread.start()
+                self.__threads.append(thread)
+
+    def stop(self) -> None:
+        self.__stopEvent.set()
+        for thread in self.__threads:
+            thread.join(timeout=1)
+
+    def isRunning(self) -> bool:
+        return not self.__stopEvent.is_set()
+
+    def getStats(self) -> List[Dict[str, Any]]:
+        return [stage.getStats() for stage in self.__stages]
@@ -1,4 +1,7 @@
+from threading import Condition, Thread
+from typing import Any, Callable, Dict, List, Optional, Set, Union
 from paho.mqtt import client as mqtt
+from spool import EVENT, SNAPSHOT, Spool
 
 
 class Publisher:
@@ -6,25 +9,184 @@ class Publisher:
     __mqttClient: mqtt.Client
     __mqttHost: str
     __mqttPort: int
+    __onConnect: Optional[Callable[..., None]]
+    __onDisconnect: Optional[Callable[..., None]]
+    __connected: bool
+    __spool: Optional[Spool]
+    __snapshotTopics: Set[str]
+    __maxMemory: int
+    __inflight: Dict[int, int]
+    __inflightBytes: int
+    __published: Set[int]
+    __condition: Condition
+    __drainer: Optional[Thread]
+    __stopped: bool
 
     def __init__(self, mqttHost: str, mqttPort: int):
         self.__mqttClient = mqtt.Client()
         self.__mqttHost = mqttHost
         self.__mqttPort = mqttPort
+        self.__onConnect = None
+        self.__onDisconnect = None
+        self.__connected = False
+        self.__spool = None
+        self.__snapshotTopics = set()
+        self.__maxMemory = 0
+        self.__inflight = {}
+        self.__inflightBytes = 0
+        self.__published = set()
+        self.__condition = Condition()
+        self.__drainer = None
+        self.__stopped = False
+        self.__mqttClient.on_connect = self.__handleConnect
+        self.__mqttClient.on_disconnect = self.__handleDisconnect
+        self.__mqttClient.on_publish = self.__handlePublish
+
+    def enableSpool(
+        self,
+        directory: str,
+        maxBytes: int,
+        maxMemory: int,
+        snapshotTopics: List[str],
+    ) -> None:
+        # Messages the broker cannot take right now wait on disk. Snapshot
+        # topics are dropped before anything else when the spool is full
+        self.__spool = Spool(directory, maxBytes)
+        self.__snapshotTopics = set(snapshotTopics)
+        self.__maxMemory = maxMemory
 
     def connect(self, keepalive: int) -> mqtt.Client:
-        self.__mqttClient.connect(self.__mqttHost, self.__mqttPort, keepalive)
+        if self.__spool is not None:
+            # A broker that is down at start is retried like any later outage
+            self.__mqttClient.reconnect_delay_set(min_delay=1, max_delay=30)
+            self.__mqttClient.connect_async(self.__mqttHost, self.__mqttPort, keepalive)
+            self.__drainer = Thread(target=self.__drainLoop, name="mqtt-spool", daemon=True)
+            self.__drainer.start()
+        else:
+            self.__mqttClient.connect(self.__mqttHost, self.__mqttPort, keepalive)
         self.__mqttClient.loop_start()
         return self.__mqttClient
 
     def disconnect(self) -> None:
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify_all()
+        if self.__drainer is not None:
+            self.__drainer.join(timeout=5)
         self.__mqttClient.disconnect()
 
+    def publish(
+        self,
+        topic: str,
+        payload: Union[str, bytes],
+        qos: int = 0,
+        retain: bool = False,
+    ) -> None:
+        # Same call as the paho client. Goes straight out while connected and
+        # nothing is waiting, older messages must not be overtaken
+        if self.__spool is None:
+            self.__mqttClient.publish(topic, payload, qos, retain)
+            return
+        data = payload.encode() if isinstance(payload, str) else payload
+        with self.__condition:
+            direct = (
+                self.__connected and self.__spool.isEmpty()
+                and self.__inflightBytes + len(data) <= self.__maxMemory
+            )
+        if direct and self.__send(topic, data, qos, retain) is not None:
+            return
+        self.__spool.append(SNAPSHOT if topic in self.__snapshotTopics else EVENT, topic, data)
+        with self.__condition:
+            self.__condition.notify_all()
+
+    def __send(self, topic: str, payload: bytes, qos: int, retain: bool) -> Optional[int]:
+        info = self.__mqttClient.publish(topic, payload, qos, retain)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            return None
+        with self.__condition:
+            # The callback may have come before publish() returned
+            if info.mid in self.__published:
+                self.__published.discard(info.mid)
+            else:
+                self.__inflight[info.mid] = len(payload)
+                self.__inflightBytes += len(payload)
+        return info.mid
+
+    def __drainLoop(self) -> None:
+        delay = 1.0
+        while True:
+            with self.__condition:
+                self.__condition.wait_for(
+                    lambda: self.__stopped or (self.__connected and not self.__spool.isEmpty()),
+                    timeout=1,
+                )
+                if self.__stopped:
+                    return
+                if not self.__connected or self.__spool.isEmpty():
+                    continue
+
+            # One batch at a time, acknowledged once paho has written all of it
+            records, position = self.__spool.read(self.__maxMemory)
+            mids = [self.__send(topic, payload, 0, False) for topic, payload in records]
+            with self.__condition:
+                sent = all(mid is not None for mid in mids) and self.__condition.wait_for(
+                    lambda: self.__stopped or not self.__connected or not any(
+                        mid in self.__inflight for mid in mids
+                    ),
+                    timeout=10,
+                ) and self.__connected
+            if sent:
+                self.__spool.ack(position)
+                delay = 1.0
+                continue
+
+            # Sent again after the backoff, the broker may see some twice
+            with self.__condition:
+                self.__condition.wait_for(lambda: self.__stopped, timeout=delay)
+            delay = min(delay * 2, 30)
+
+    def __handleConnect(self, client: mqtt.Client, userdata: Any, flags: Any, rc: int) -> None:
+        with self.__condition:
+            self.__connected = rc == 0
+            self.__condition.notify_all()
+        if self.__onConnect is not None:
+            self.__onConnect(client, userdata, flags, rc)
+
+    def __handleDisconnect(self, client: mqtt.Client, userdata: Any, rc: int) -> None:
+        with self.__condition:
+            self.__connected = False
+            # Whatever paho still held is gone, the spool keeps its copy
+            self.__inflight.clear()
+            self.__inflightBytes = 0
+            self.__published.clear()
+            self.__condition.notify_all()
+        if self.__onDisconnect is not None:
+            self.__onDisconnect(client, userdata, rc)
+
+    def __handlePublish(self, client: mqtt.Client, userdata: Any, mid: int) -> None:
+        if self.__spool is None:
+            return
+        with self.__condition:
+            size = self.__inflight.pop(mid, None)
+            if size is None:
+                self.__published.add(mid)
+            else:
+                self.__inflightBytes -= size
+            self.__condition.notify_all()
+
+    def getStats(self) -> Dict[str, Any]:
+        return {
+            "connected": self.__connected,
+            "inflight": self.__inflightBytes,
+            "spooled": self.__spool.getPendingBytes() if self.__spool is not None else 0,
+            "dropped": self.__spool.getDroppedBytes() if self.__spool is not None else 0,
+        }
+
     def setOnConnectCallback(self, callback: mqtt.Client.on_connect) -> None:
-        self.__mqttClient.on_connect = callback
+        self.__onConnect = callback
 
     def setOnMessageCallback(self, callback: mqtt.Client.on_message) -> None:
         self.__mqttClient.on_message = callback
 
     def setOnDisconnectCallback(self, callback: mqtt.Client.on_disconnect) -> None:
-        self.__mqttClient.on_disconnect = callback
+        self.__onDisconnect = callback
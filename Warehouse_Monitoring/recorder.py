@@ -0,0 +1,217 @@
+from collections import deque
+from json import dump
+from os import makedirs, path as osPath, scandir
+from queue import Queue
+from re import sub
+from shutil import rmtree
+from threading import Lock, Thread
+from time import localtime, strftime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+CLIP_FILE = "clip.mjpeg"
+INDEX_FILE = "index.json"
+
+
+def getClipName(camera: str, timestamp: int) -> str:
+    # Camera names may be device paths or URLs
+    safeName = sub(r"[^A-Za-z0-9_.-]+", "_", camera).strip("_") or "camera"
+    startTime = strftime("%Y%m%d-%H%M%S", localtime(timestamp / 1000))
+    return f"{safeName}-{startTime}-{timestamp % 1000:03d}"
+
+
+class ClipRecorder:
+
+    __directory: str
+    __camera: str
+    __preRoll: int
+    __postRoll: int
+    __maxLength: int
+    __maxMemory: int
+    __diskQuota: int
+    __ring: Deque[Tuple[int, bytes, int]]
+    __ringBytes: int
+    __clipStart: int
+    __clipEnd: int
+    __lastWritten: int
+    __queue: Queue
+    __queuedBytes: int
+    __lock: Lock
+    __clips: int
+    __dropped: int
+    __errors: int
+    __writer: Thread
+
+    def __init__(
+        self,
+        directory: str,
+        camera: str,
+        preRoll: float = 5,
+        postRoll: float = 5,
+        maxLength: float = 60,
+        maxMemory: float = 64,
+        diskQuota: float = 1024,
+    ) -> None:
+        self.__directory = directory
+        self.__camera = camera
+        # Seconds and megabytes on the outside, milliseconds and bytes inside
+        self.__preRoll = round(preRoll * 1000)
+        self.__postRoll = round(postRoll * 1000)
+        self.__maxLength = round(maxLength * 1000)
+        self.__maxMemory = round(maxMemory * 1024 * 1024)
+        self.__diskQuota = round(diskQuota * 1024 * 1024)
+        self.__ring = deque()
+        self.__ringBytes = 0
+        self.__clipStart = 0
+        self.__clipEnd = 0
+        self.__lastWritten = 0
+        self.__queue = Queue()
+        self.__queuedBytes = 0
+        self.__lock = Lock()
+        self.__clips = 0
+        self.__dropped = 0
+        self.__errors = 0
+        makedirs(directory, exist_ok=True)
+        self.__writer = Thread(target=self.__writeLoop, name=f"recorder-{camera}", daemon=True)
+        self.__writer.start()
+
+    def addFrame(self, timestamp: int, jpeg: bytes, persons: int) -> None:
+        # Called from the publish step, only ever appends to memory, the disk
+        # is left to the writer thread
+        self.__ring.append((timestamp, jpeg, persons))
+        self.__ringBytes += len(jpeg)
+        while len(self.__ring) > 1 and (
+            timestamp - self.__ring[0][0] > self.__preRoll or self.__ringBytes > self.__maxMemory
+        ):
+            self.__ringBytes -= len(self.__ring.popleft()[1])
+
+        if self.__clipEnd == 0:
+            if persons == 0:
+                return
+            # Alert edge, the pre-roll goes out ahead of this frame, minus what
+            # the previous clip already holds
+            self.__clipStart = timestamp
+            self.__queue.put(("start", timestamp))
+            for item in self.__ring:
+                if item[0] > self.__lastWritten:
+                    self.__enqueue(item)
+        else:
+            self.__enqueue((timestamp, jpeg, persons))
+        self.__lastWritten = timestamp
+
+        if persons > 0:
+            self.__clipEnd = min(timestamp + self.__postRoll, self.__clipStart + self.__maxLength)
+        if timestamp >= self.__clipEnd:
+            self.__queue.put(("end", timestamp))
+            self.__clipEnd = 0
+
+    def __enqueue(self, item: Tuple[int, bytes, int]) -> None:
+        # A slow disk costs frames of the clip, never time in the loop
+        with self.__lock:
+            if self.__queuedBytes + len(item[1]) > self.__maxMemory:
+                self.__dropped += 1
+                return
+            self.__queuedBytes += len(item[1])
+        self.__queue.put(("frame", item))
+
+    def __writeLoop(self) -> None:
+        clipPath: Optional[str] = None
+        clipFile: Any = None
+        index: Dict[str, Any] = {}
+        frames: List[Dict[str, Any]] = []
+        while True:
+            message = self.__queue.get()
+            if message is None:
+                break
+            kind, value = message
+            try:
+                if kind == "start":
+                    clipPath = osPath.join(self.__directory, getClipName(self.__camera, value))
+                    makedirs(clipPath, exist_ok=True)
+                    clipFile = open(osPath.join(clipPath, CLIP_FILE), "wb")
+                    index = {"camera": self.__camera, "alert": value}
+                    frames = []
+                elif kind == "frame":
+                    timestamp, jpeg, persons = value
+                    with self.__lock:
+                        self.__queuedBytes -= len(jpeg)
+                    if clipFile is not None:
+                        frames.append({
+                            "timestamp": timestamp,
+                            "offset": clipFile.tell(),
+                            "size": len(jpeg),
+                            "persons": persons,
+                        })
+                        clipFile.write(jpeg)
+                elif clipFile is not None:
+                    self.__finishClip(clipPath, clipFile, index, frames)
+                    clipPath, clipFile = None, None
+            except OSError:
+                self.__errors += 1
+                if clipFile is not None:
+                    clipFile.close()
+                clipPath, clipFile = None, None
+        if clipFile is not None:
+            try:
+                self.__finishClip(clipPath, clipFile, index, frames)
+            except OSError:
+                self.__errors += 1
+
+    def __finishClip(
+        self,
+        clipPath: str,
+        clipFile: Any,
+        index: Dict[str, Any],
+        frames: List[Dict[str, Any]],
+    ) -> None:
+        clipFile.close()
+        index["start"] = frames[0]["timestamp"] if len(frames) != 0 else index["alert"]
+        index["end"] = frames[-1]["timestamp"] if len(frames) != 0 else index["alert"]
+        index["file"] = CLIP_FILE
+        index["frames"] = frames
+        # Written last, a clip without index was cut short
+        with open(osPath.join(clipPath, INDEX_FILE), "w") as file:
+            dump(index, file, separators=(",", ":"))
+        self.__clips += 1
+        self.__enforceQuota(clipPath)
+
+    def __enforceQuota(self, keepPath: str) -> None:
+        clips: List[Tuple[float, str, int]] = []
+        for entry in scandir(self.__directory):
+            clipFile = osPath.join(entry.path, CLIP_FILE)
+            # Only finished clips, one without index may still be written by
+            # another camera sharing the directory
+            if not entry.is_dir() or not osPath.exists(osPath.join(entry.path, INDEX_FILE)):
+                continue
+            try:
+                size = sum(file.stat().st_size for file in scandir(entry.path) if file.is_file())
+                clips.append((osPath.getmtime(clipFile), entry.path, size))
+            except OSError:
+                # Removed meanwhile by another recorder
+                continue
+
+        # Oldest clips go first, other cameras may share the directory
+        total = sum(size for _, _, size in clips)
+        for _, clipPath, size in sorted(clips):
+            if total <= self.__diskQuota:
+                break
+            if clipPath == keepPath:
+                continue
+            rmtree(clipPath, ignore_errors=True)
+            total -= size
+
+    def getStats(self) -> Dict[str, Any]:
+        return {
+            "clips": self.__clips,
+            "recording": self.__clipEnd != 0,
+            "dropped": self.__dropped,
+            "errors": self.__errors,
+        }
+
+    def close(self) -> None:
+        # Finishes the clip being written
+        if self.__clipEnd != 0:
+            self.__queue.put(("end", self.__clipEnd))
+            self.__clipEnd = 0
+        self.__queue.put(None)
+        self.__writer.join(timeout=5)
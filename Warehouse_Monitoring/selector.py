@@ -0,0 +1,140 @@
+from hashlib import sha256
+from json import dump, load
+from os import cpu_count, replace
+from platform import machine, processor
+from time import perf_counter, strftime
+from typing import Any, Dict, List, Optional
+from detector import Detector
+
+
+def getCpuName() -> str:
+    # platform.processor() is empty on most ARM boards, the Raspberry Pi
+    # only names itself in /proc/cpuinfo
+    names: Dict[str, str] = {}
+    try:
+        with open("/proc/cpuinfo") as file:
+            for line in file:
+                key, _, value = line.partition(":")
+                names.setdefault(key.strip(), value.strip())
+    except OSError:
+        pass
+    name = names.get("Model") or names.get("model name") or processor() or machine()
+    return f"{name} x{cpu_count()}"
+
+
+def hashFile(path: str) -> str:
+    digest = sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelSelector:
+
+    __modelPaths: List[str]
+    __accuracy: List[int]
+    __cachePath: str
+    __scoreThreshold: float
+    __warmup: int
+    __iterations: int
+    __cache: Dict[str, Any]
+    __results: Dict[int, Dict[str, Any]]
+
+    def __init__(
+        self,
+        modelPaths: List[str],
+        accuracy: List[int],
+        cachePath: str,
+        scoreThreshold: float,
+        warmup: int = 3,
+        iterations: int = 20,
+    ) -> None:
+        self.__modelPaths = modelPaths
+        self.__accuracy = accuracy
+        self.__cachePath = cachePath
+        self.__scoreThreshold = scoreThreshold
+        self.__warmup = warmup
+        self.__iterations = iterations
+        self.__cache = self.__loadCache()
+        self.__results = {}
+
+    def __loadCache(self) -> Dict[str, Any]:
+        try:
+            with open(self.__cachePath) as file:
+                cache = load(file)
+            return cache if isinstance(cache, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def __saveCache(self) -> None:
+        # Written aside and swapped in, an interrupted start leaves the old file
+        try:
+            with open(self.__cachePath + ".tmp", "w") as file:
+                dump(self.__cache, file, indent=2)
+            replace(self.__cachePath + ".tmp", self.__cachePath)
+        except OSError:
+            pass
+
+    def __measure(self, modelPath: str, frames: List[Any]) -> float:
+        detector = Detector(modelPath, self.__scoreThreshold)
+        try:
+            # The first inferences are much slower and would not repeat
+            for index in range(self.__warmup):
+                detector.getDetections(frames[index % len(frames)])
+            startTime = perf_counter()
+            for index in range(self.__iterations):
+                detector.getDetections(frames[index % len(frames)])
+            return self.__iterations / (perf_counter() - startTime)
+        finally:
+            detector.close()
+
+    def measure(self, modelIndex: int, frames: List[Any]) -> Optional[float]:
+        modelPath = self.__modelPaths[modelIndex]
+        try:
+            height, width = frames[0].shape[:2]
+            # Same model file on the same machine and frame size runs the same
+            key = f"{hashFile(modelPath)}:{getCpuName()}:{width}x{height}"
+        except OSError:
+            self.__results[modelIndex] = {"path": modelPath, "error": "missing"}
+            return None
+
+        if key in self.__cache:
+            fps = self.__cache[key]["fps"]
+            self.__results[modelIndex] = {"path": modelPath, "fps": fps, "cached": True}
+            return fps
+
+        try:
+            fps = round(self.__measure(modelPath, frames), 2)
+        except Exception as error:
+            self.__results[modelIndex] = {"path": modelPath, "error": repr(error)}
+            return None
+        self.__cache[key] = {
+            "path": modelPath,
+            "fps": fps,
+            "date": strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+        self.__saveCache()
+        self.__results[modelIndex] = {"path": modelPath, "fps": fps, "cached": False}
+        return fps
+
+    def select(self, frames: List[Any], targetFps: float) -> Optional[int]:
+        # Most accurate model that keeps up, the faster one among equals. When
+        # none keeps up the fastest one gets as close as possible
+        measured: Dict[int, float] = {}
+        for modelIndex in range(len(self.__modelPaths)):
+            fps = self.measure(modelIndex, frames)
+            if fps is not None:
+                measured[modelIndex] = fps
+        if len(measured) == 0:
+            return None
+        passing = [modelIndex for modelIndex, fps in measured.items() if fps >= targetFps]
+        if len(passing) == 0:
+            return max(measured, key=lambda modelIndex: measured[modelIndex])
+        return max(
+            passing,
+            key=lambda modelIndex: (self.__accuracy[modelIndex], measured[modelIndex]),
+        )
+
+    def getResults(self) -> Dict[int, Dict[str, Any]]:
+        return self.__results
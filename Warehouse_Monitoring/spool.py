@@ -0,0 +1,179 @@
+from collections import deque
+from os import listdir, makedirs, path as osPath, remove, replace
+from re import fullmatch
+from struct import Struct
+from threading import Lock
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+# Drained first and the last to be dropped when the spool is full
+EVENT = 0
+SNAPSHOT = 1
+
+# Topic length and payload length ahead of every record
+HEADER = Struct("<HI")
+
+
+class Spool:
+
+    __directory: str
+    __maxBytes: int
+    __segmentBytes: int
+    __segments: Dict[int, Deque[str]]
+    __sizes: Dict[str, int]
+    __offsets: Dict[int, int]
+    __totalBytes: int
+    __droppedBytes: int
+    __nextSegment: int
+    __lock: Lock
+
+    def __init__(self, directory: str, maxBytes: int, segmentBytes: int = 4 * 1024 * 1024) -> None:
+        self.__directory = directory
+        self.__maxBytes = maxBytes
+        # Space is given back a segment at a time, keep them small against the cap
+        self.__segmentBytes = max(1, min(segmentBytes, maxBytes // 8))
+        self.__segments = {EVENT: deque(), SNAPSHOT: deque()}
+        self.__sizes = {}
+        self.__offsets = {EVENT: 0, SNAPSHOT: 0}
+        self.__totalBytes = 0
+        self.__droppedBytes = 0
+        self.__nextSegment = 0
+        self.__lock = Lock()
+        makedirs(directory, exist_ok=True)
+        self.__recover()
+
+    def __recover(self) -> None:
+        # Whatever was not sent before a restart is picked up again
+        found: List[Tuple[int, int, str]] = []
+        for name in listdir(self.__directory):
+            match = fullmatch(r"([01])-(\d+)\.seg", name)
+            if match is not None:
+                found.append((int(match.group(2)), int(match.group(1)), name))
+        for number, priority, name in sorted(found):
+            path = osPath.join(self.__directory, name)
+            self.__segments[priority].append(path)
+            self.__sizes[path] = osPath.getsize(path)
+            self.__totalBytes += self.__sizes[path]
+            self.__nextSegment = number + 1
+        for priority in (EVENT, SNAPSHOT):
+            try:
+                with open(self.__getOffsetPath(priority)) as file:
+                    offset = int(file.read().strip() or 0)
+            except (OSError, ValueError):
+                offset = 0
+            segments = self.__segments[priority]
+            if len(segments) != 0 and offset <= self.__sizes[segments[0]]:
+                self.__offsets[priority] = offset
+
+    def __getOffsetPath(self, priority: int) -> str:
+        return osPath.join(self.__directory, f"{priority}.offset")
+
+    def __saveOffset(self, priority: int) -> None:
+        path = self.__getOffsetPath(priority)
+        with open(path + ".tmp", "w") as file:
+            file.write(str(self.__offsets[priority]))
+        replace(path + ".tmp", path)
+
+    def __dropHead(self, priority: int) -> int:
+        path = self.__segments[priority].popleft()
+        size = self.__sizes.pop(path)
+        self.__totalBytes -= size
+        self.__offsets[priority] = 0
+        try:
+            remove(path)
+        except OSError:
+            pass
+        return size
+
+    def append(self, priority: int, topic: str, payload: bytes) -> bool:
+        topicBytes = topic.encode()
+        record = HEADER.pack(len(topicBytes), len(payload)) + topicBytes + payload
+        with self.__lock:
+            if len(record) > self.__maxBytes:
+                self.__droppedBytes += len(record)
+                return False
+            # Snapshots are given up first, a new snapshot never pushes out events
+            while self.__totalBytes + len(record) > self.__maxBytes:
+                victims = (SNAPSHOT, EVENT) if priority == EVENT else (SNAPSHOT,)
+                victim = next((
+                    victim for victim in victims if len(self.__segments[victim]) != 0
+                ), None)
+                if victim is None:
+                    self.__droppedBytes += len(record)
+                    return False
+                sentBytes = self.__offsets[victim]
+                self.__droppedBytes += self.__dropHead(victim) - sentBytes
+
+            segments = self.__segments[priority]
+            if len(segments) == 0 or self.__sizes[segments[-1]] + len(record) > self.__segmentBytes:
+                path = osPath.join(self.__directory, f"{priority}-{self.__nextSegment:010d}.seg")
+                self.__nextSegment += 1
+                segments.append(path)
+                self.__sizes[path] = 0
+            path = segments[-1]
+            with open(path, "ab") as file:
+                file.write(record)
+            self.__sizes[path] += len(record)
+            self.__totalBytes += len(record)
+        return True
+
+    def read(
+        self,
+        maxBytes: int,
+    ) -> Tuple[List[Tuple[str, bytes]], Optional[Tuple[int, str, int]]]:
+        # A batch comes from the oldest segment of the most important kind,
+        # it stays in the spool until acknowledged
+        with self.__lock:
+            priority = next((
+                priority for priority in (EVENT, SNAPSHOT) if len(self.__segments[priority]) != 0
+            ), None)
+            if priority is None:
+                return [], None
+            path = self.__segments[priority][0]
+            offset = self.__offsets[priority]
+            size = self.__sizes[path]
+            records: List[Tuple[str, bytes]] = []
+            with open(path, "rb") as file:
+                file.seek(offset)
+                while offset < size:
+                    header = file.read(HEADER.size)
+                    if len(header) < HEADER.size:
+                        # Cut short by a crash, the rest is lost
+                        offset = size
+                        break
+                    topicLength, payloadLength = HEADER.unpack(header)
+                    if len(records) != 0 and payloadLength > maxBytes:
+                        break
+                    body = file.read(topicLength + payloadLength)
+                    if len(body) < topicLength + payloadLength:
+                        offset = size
+                        break
+                    records.append((body[:topicLength].decode(), body[topicLength:]))
+                    offset += HEADER.size + len(body)
+                    maxBytes -= len(body)
+                    if maxBytes <= 0:
+                        break
+            return records, (priority, path, offset)
+
+    def ack(self, position: Tuple[int, str, int]) -> None:
+        priority, path, offset = position
+        with self.__lock:
+            segments = self.__segments[priority]
+            # Evicted while it was being sent
+            if len(segments) == 0 or segments[0] != path:
+                return
+            if offset >= self.__sizes[path]:
+                self.__dropHead(priority)
+            else:
+                self.__offsets[priority] = offset
+            self.__saveOffset(priority)
+
+    def isEmpty(self) -> bool:
+        return self.getPendingBytes() == 0
+
+    def getPendingBytes(self) -> int:
+        with self.__lock:
+            return self.__totalBytes - sum(self.__offsets.values())
+
+    def getDroppedBytes(self) -> int:
+        return self.__droppedBytes
@@ -0,0 +1,283 @@
+from asyncio import (
+    AbstractEventLoop, Event as AsyncEvent, IncompleteReadError, LimitOverrunError, StreamReader,
+    StreamWriter, Task, TimeoutError as AsyncTimeoutError, current_task, gather, get_running_loop,
+    run, start_server, wait_for,
+)
+from concurrent.futures import ThreadPoolExecutor
+from logging import Logger
+from threading import Event, Thread
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+
+BOUNDARY = b"frame"
+STREAM_HEADERS = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: multipart/x-mixed-replace; boundary=" + BOUNDARY + b"\r\n"
+    b"Cache-Control: no-cache, private\r\nPragma: no-cache\r\nConnection: close\r\n\r\n"
+)
+
+
+class StreamServer:
+
+    __host: str
+    __port: int
+    __maxClients: int
+    __stallTimeout: float
+    __streams: Dict[str, Any]
+    __routes: Dict[str, Tuple[str, Callable[[], bytes]]]
+    __clients: Dict[str, Set[StreamWriter]]
+    __lastProgress: Dict[StreamWriter, float]
+    __sent: Dict[str, int]
+    __dropped: Dict[str, int]
+    __rejected: int
+    __handlers: Set[Task]
+    __loop: Optional[AbstractEventLoop]
+    __stopping: Optional[AsyncEvent]
+    __started: Event
+    __thread: Optional[Thread]
+    __logger: Optional[Logger]
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        maxClients: int = 20,
+        stallTimeout: float = 30,
+        logger: Optional[Logger] = None,
+    ) -> None:
+        self.__host = host
+        self.__port = port
+        self.__maxClients = maxClients
+        self.__stallTimeout = stallTimeout
+        self.__streams = {}
+        self.__routes = {}
+        self.__clients = {}
+        self.__lastProgress = {}
+        self.__sent = {}
+        self.__dropped = {}
+        self.__rejected = 0
+        self.__handlers = set()
+        self.__loop = None
+        self.__stopping = None
+        self.__started = Event()
+        self.__thread = None
+        self.__logger = logger
+
+    def addStream(self, path: str, buffer: Any) -> None:
+        # buffer is anything with Buffer's getData()/waitData()
+        self.__streams[path] = buffer
+        self.__clients[path] = set()
+        self.__sent[path] = 0
+        self.__dropped[path] = 0
+
+    def addRoute(self, path: str, contentType: str, handler: Callable[[], bytes]) -> None:
+        self.__routes[path] = (contentType, handler)
+
+    def start(self) -> None:
+        self.__thread = Thread(
+            target=run,
+            args=(self.__serve(),),
+            name="stream-server",
+            daemon=True,
+        )
+        self.__thread.start()
+        self.__started.wait(timeout=5)
+        if not self.__started.is_set():
+            raise RuntimeError(f"stream server could not listen on {self.__host}:{self.__port}")
+
+    def stop(self) -> None:
+        if self.__loop is not None and self.__stopping is not None:
+            self.__loop.call_soon_threadsafe(self.__stopping.set)
+        if self.__thread is not None:
+            self.__thread.join(timeout=2)
+
+    def getClients(self, path: Optional[str] = None) -> int:
+        if path is not None:
+            return len(self.__clients.get(path, ()))
+        return sum(len(clients) for clients in self.__clients.values())
+
+    def getReadyClients(self, path: str) -> int:
+        # Viewers whose socket took everything sent so far, a frame set now
+        # reaches them without waiting behind an older one
+        try:
+            writers = tuple(self.__clients.get(path, ()))
+        except RuntimeError:
+            # Changed by the server thread while copied, assume one is ready
+            return 1
+        return sum(
+            1 for writer in writers
+            if not writer.transport.is_closing() and writer.transport.get_write_buffer_size() == 0
+        )
+
+    def getStats(self) -> Dict[str, Any]:
+        return {
+            "streams": {
+                path: {
+                    "clients": len(self.__clients[path]),
+                    "sent": self.__sent[path],
+                    "dropped": self.__dropped[path],
+                }
+                for path in self.__streams
+            },
+            "rejected": self.__rejected,
+        }
+
+    async def __serve(self) -> None:
+        self.__loop = get_running_loop()
+        self.__stopping = AsyncEvent()
+        # One waiting thread per stream, not one per viewer
+        waiters = ThreadPoolExecutor(
+            max_workers=max(1, len(self.__streams)),
+            thread_name_prefix="stream-wait",
+        )
+        tasks = [
+            self.__loop.create_task(self.__broadcast(path, buffer, waiters))
+            for path, buffer in self.__streams.items()
+        ]
+        server = await start_server(self.__handle, self.__host, self.__port, reuse_address=True)
+        self.__started.set()
+        async with server:
+            await self.__stopping.wait()
+        for task in tasks:
+            task.cancel()
+        # Dropping the connections lets every viewer handler return on its own
+        for clients in self.__clients.values():
+            for writer in clients:
+                writer.transport.abort()
+        if len(self.__handlers) != 0:
+            await wait_for(gather(*self.__handlers, return_exceptions=True), timeout=2)
+        waiters.shutdown(wait=False)
+
+    async def __broadcast(self, path: str, buffer: Any, waiters: ThreadPoolExecutor) -> None:
+        sequence = 0
+        clients = self.__clients[path]
+        while True:
+            latestSequence, data = await self.__loop.run_in_executor(
+                waiters, buffer.waitData, sequence, 1.0,
+            )
+            if latestSequence == sequence or data is None:
+                continue
+            sequence = latestSequence
+            if len(clients) == 0:
+                continue
+
+            # The part is built once and the same bytes go to every viewer
+            chunk = self.__getPart(data)
+            now = self.__loop.time()
+            for writer in list(clients):
+                transport = writer.transport
+                if transport.is_closing():
+                    clients.discard(writer)
+                    continue
+                # More than a frame still queued means the socket is backed
+                # up, skip this frame for that viewer instead of buffering it
+                if transport.get_write_buffer_size() > len(chunk):
+                    self.__dropped[path] += 1
+                    if now - self.__lastProgress.get(writer, now) > self.__stallTimeout:
+                        transport.abort()
+                        clients.discard(writer)
+                    continue
+                self.__lastProgress[writer] = now
+                transport.write(chunk)
+                self.__sent[path] += 1
+
+    def __getPart(self, data: bytes) -> bytes:
+        return (
+            b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\n"
+            + b"Content-Length: " + str(len(data)).encode() + b"\r\n\r\n"
+            + data + b"\r\n"
+        )
+
+    def __respond(
+        self, writer: StreamWriter, status: str, contentType: str, body: bytes, head: bool = False,
+    ) -> None:
+        # HEAD gets the same headers, Content-Length included, but no body
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {contentType}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+            + (b"" if head else body)
+        )
+
+    async def __handle(self, reader: StreamReader, writer: StreamWriter) -> None:
+        task = current_task()
+        self.__handlers.add(task)
+        try:
+            await self.__serveClient(reader, writer)
+        finally:
+            self.__handlers.discard(task)
+
+    async def __serveClient(self, reader: StreamReader, writer: StreamWriter) -> None:
+        try:
+            request = await wait_for(reader.readuntil(b"\r\n\r\n"), timeout=10)
+            method, target = request.split(b"\r\n", 1)[0].decode("latin-1").split(" ")[:2]
+        except (
+            IncompleteReadError, LimitOverrunError, AsyncTimeoutError, ValueError, ConnectionError,
+        ):
+            writer.transport.abort()
+            return
+
+        path = target.split("?", 1)[0]
+        head = method == "HEAD"
+        try:
+            if method not in ("GET", "HEAD"):
+                self.__respond(
+                    writer, "405 Method Not Allowed", "text/plain", b"method not allowed\n",
+                )
+            elif path in self.__streams and head:
+                # Headers only, no viewer slot is taken
+                writer.write(STREAM_HEADERS)
+            elif path in self.__streams:
+                await self.__stream(path, reader, writer)
+                return
+            elif path in self.__routes:
+                contentType, handler = self.__routes[path]
+                # Handlers may take a lock or render a page, keep them off the loop
+                try:
+                    body = await self.__loop.run_in_executor(None, handler)
+                except Exception:
+                    if self.__logger is not None:
+                        self.__logger.exception(f"handler for {path} failed")
+                    self.__respond(
+                        writer, "500 Internal Server Error", "text/plain", b"internal server error\n",
+                        head,
+                    )
+                else:
+                    if body is None:
+                        self.__respond(writer, "404 Not Found", "text/plain", b"not found\n", head)
+                    else:
+                        self.__respond(writer, "200 OK", contentType, body, head)
+            else:
+                self.__respond(writer, "404 Not Found", "text/plain", b"not found\n", head)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if not writer.transport.is_closing():
+                writer.close()
+
+    async def __stream(self, path: str, reader: StreamReader, writer: StreamWriter) -> None:
+        if self.getClients() >= self.__maxClients:
+            self.__rejected += 1
+            self.__respond(writer, "503 Service Unavailable", "text/plain", b"too many viewers\n")
+            writer.close()
+            return
+
+        writer.write(STREAM_HEADERS)
+        # Show the last frame right away instead of waiting for the next one
+        latest = self.__streams[path].getData()
+        if latest:
+            writer.write(self.__getPart(latest))
+
+        clients = self.__clients[path]
+        clients.add(writer)
+        self.__lastProgress[writer] = self.__loop.time()
+        try:
+            # Viewers never send anything useful, this only returns on disconnect
+            while await reader.read(4096):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            clients.discard(writer)
+            self.__lastProgress.pop(writer, None)
+            writer.transport.abort()
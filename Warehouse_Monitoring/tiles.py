@@ -0,0 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Tuple
+from detections import DetectionBatch
+
+
+def getTiles(
+    bounds: Tuple[int, int, int, int],
+    columns: int,
+    rows: int,
+    overlap: float,
+) -> List[Tuple[int, int, int, int]]:
+    # Equal tiles covering bounds, neighbours share overlap of a tile so a
+    # person on a border is whole in at least one of them. Sizes are rounded
+    # once and only the offsets spread the rounding, so every tile has the
+    # same pixel size and the detector converts them into one buffer
+    x1, y1, x2, y2 = bounds
+    tileWidth = min(round((x2 - x1) / (columns - (columns - 1) * overlap)), x2 - x1)
+    tileHeight = min(round((y2 - y1) / (rows - (rows - 1) * overlap)), y2 - y1)
+    tiles = []
+    for row in range(rows):
+        for column in range(columns):
+            left = x1 + (round(column * (x2 - x1 - tileWidth) / (columns - 1)) if columns > 1 else 0)
+            top = y1 + (round(row * (y2 - y1 - tileHeight) / (rows - 1)) if rows > 1 else 0)
+            tiles.append((left, top, left + tileWidth, top + tileHeight))
+    return tiles
+
+
+class TileDetector:
+
+    __detector: Any
+    __columns: int
+    __rows: int
+    __overlap: float
+    __region: Optional[Tuple[int, int, int, int]]
+    __threshold: float
+    __executor: Optional[ThreadPoolExecutor]
+
+    def __init__(
+        self,
+        detector: Any,
+        columns: int,
+        rows: int,
+        overlap: float = 0.2,
+        region: Optional[Tuple[int, int, int, int]] = None,
+        threshold: float = 0.6,
+    ) -> None:
+        self.__detector = detector
+        self.__columns = columns
+        self.__rows = rows
+        self.__overlap = overlap
+        # Only the far end of the room is tiled when a region is given
+        self.__region = region
+        self.__threshold = threshold
+        self.__executor = (
+            ThreadPoolExecutor(max_workers=detector.getSize(), thread_name_prefix="tile")
+            if detector.getSize() > 1 else None
+        )
+
+    def getCrops(self, frameWidth: int, frameHeight: int) -> List[Tuple[int, int, int, int]]:
+        x1, y1, x2, y2 = self.__region or (0, 0, frameWidth, frameHeight)
+        bounds = (max(x1, 0), max(y1, 0), min(x2, frameWidth), min(y2, frameHeight))
+        # The full frame goes first, it finds the persons close to the
+        # camera that are larger than a tile
+        crops = [(0, 0, frameWidth, frameHeight)]
+        if bounds[2] > bounds[0] and bounds[3] > bounds[1]:
+            crops += getTiles(bounds, self.__columns, self.__rows, self.__overlap)
+        return crops
+
+    def __detectCrop(self, frame: Any, bounds: Tuple[int, int, int, int]) -> DetectionBatch:
+        x1, y1, x2, y2 = bounds
+        return self.__detector.getDetectionBatch(frame[y1:y2, x1:x2]).translate(x1, y1)
+
+    def getDetectionBatch(self, frame: Any) -> DetectionBatch:
+        frameHeight, frameWidth = frame.shape[:2]
+        crops = self.getCrops(frameWidth, frameHeight)
+        if self.__executor is not None:
+            results = list(self.__executor.map(lambda crop: self.__detectCrop(frame, crop), crops))
+        else:
+            results = [self.__detectCrop(frame, crop) for crop in crops]
+        # Persons seen by several tiles are merged back into one box
+        return DetectionBatch.concatenate(results).suppress(self.__threshold)
+
+    def close(self) -> None:
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False)
@@ -0,0 +1,191 @@
+from typing import Any, Dict, List, Optional, Tuple
+from numpy import argsort, array, bool_, concatenate, float32, float64, int64, maximum, minimum, ndarray, ones, unravel_index, zeros
+
+
+def iouMatrix(a: ndarray, b: ndarray) -> ndarray:
+    # Pairwise IoU of two sets of (x1, y1, x2, y2) boxes, shape (len(a), len(b))
+    if len(a) == 0 or len(b) == 0:
+        return zeros((len(a), len(b)), dtype=float32)
+    x1 = maximum(a[:, None, 0], b[None, :, 0])
+    y1 = maximum(a[:, None, 1], b[None, :, 1])
+    x2 = minimum(a[:, None, 2], b[None, :, 2])
+    y2 = minimum(a[:, None, 3], b[None, :, 3])
+    intersection = maximum(x2 - x1, 0) * maximum(y2 - y1, 0)
+    areaA = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    areaB = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = areaA[:, None] + areaB[None, :] - intersection
+    return intersection / maximum(union, 1e-6)
+
+
+class Tracker:
+
+    __iouThreshold: float
+    __maxMisses: int
+    __minHits: int
+    __dwellTime: float
+    __alpha: float
+    __beta: float
+    __nextId: int
+    __lastUpdate: Optional[int]
+    __ids: ndarray
+    __boxes: ndarray
+    __velocities: ndarray
+    __scores: ndarray
+    __hits: ndarray
+    __misses: ndarray
+    __firstSeen: ndarray
+    __dwellCount: ndarray
+    __confirmed: ndarray
+
+    def __init__(
+        self,
+        iouThreshold: float = 0.3,
+        maxMisses: int = 15,
+        minHits: int = 2,
+        dwellTime: float = 30,
+        alpha: float = 0.6,
+        beta: float = 0.2,
+    ) -> None:
+        self.__iouThreshold = iouThreshold
+        self.__maxMisses = maxMisses
+        self.__minHits = minHits
+        self.__dwellTime = dwellTime
+        self.__alpha = alpha
+        self.__beta = beta
+        self.__nextId = 1
+        self.__lastUpdate = None
+        self.__ids = zeros(0, dtype=int64)
+        self.__boxes = zeros((0, 4), dtype=float32)
+        self.__velocities = zeros((0, 4), dtype=float32)
+        self.__scores = zeros(0, dtype=float32)
+        self.__hits = zeros(0, dtype=int64)
+        self.__misses = zeros(0, dtype=int64)
+        self.__firstSeen = zeros(0, dtype=float64)
+        self.__dwellCount = zeros(0, dtype=int64)
+        self.__confirmed = zeros(0, dtype=bool_)
+
+    def __match(self, predicted: ndarray, boxes: ndarray) -> List[Tuple[int, int]]:
+        # Greedy assignment, highest IoU pairs first
+        iou = iouMatrix(predicted, boxes)
+        matches: List[Tuple[int, int]] = []
+        usedTracks, usedBoxes = set(), set()
+        for flat in argsort(-iou, axis=None):
+            track, box = unravel_index(flat, iou.shape)
+            if iou[track, box] < self.__iouThreshold:
+                break
+            if track in usedTracks or box in usedBoxes:
+                continue
+            usedTracks.add(track)
+            usedBoxes.add(box)
+            matches.append((int(track), int(box)))
+        return matches
+
+    def __getElapsed(self, timestamp: int) -> int:
+        # Velocities are kept per millisecond, detections need not arrive at
+        # a fixed rate
+        if self.__lastUpdate is None:
+            return 1
+        return max(timestamp - self.__lastUpdate, 1)
+
+    def update(
+        self,
+        boxes: Any,
+        timestamp: int,
+        scores: Optional[Any] = None,
+    ) -> Tuple[List[int], List[Dict[str, Any]]]:
+        boxes = array(boxes, dtype=float32).reshape(-1, 4)
+        scores = (
+            zeros(len(boxes), dtype=float32) if scores is None
+            else array(scores, dtype=float32).reshape(-1)
+        )
+        elapsed = self.__getElapsed(timestamp)
+        self.__lastUpdate = timestamp
+        predicted = self.__boxes + self.__velocities * elapsed
+        matches = self.__match(predicted, boxes)
+        trackIndex = array([track for track, _ in matches], dtype=int64)
+        boxIndex = array([box for _, box in matches], dtype=int64)
+
+        # Alpha-beta filter update of matched tracks, all at once
+        residual = boxes[boxIndex] - predicted[trackIndex]
+        self.__boxes = predicted
+        self.__boxes[trackIndex] += self.__alpha * residual
+        self.__velocities[trackIndex] += self.__beta * residual / elapsed
+        self.__scores[trackIndex] = scores[boxIndex]
+        self.__hits[trackIndex] += 1
+        self.__misses += 1
+        self.__misses[trackIndex] = 0
+
+        # Unmatched boxes start new tentative tracks
+        unmatched = ones(len(boxes), dtype=bool_)
+        unmatched[boxIndex] = False
+        newCount = int(unmatched.sum())
+        newIds = array(range(self.__nextId, self.__nextId + newCount), dtype=int64)
+        self.__nextId += newCount
+        self.__ids = concatenate([self.__ids, newIds])
+        self.__boxes = concatenate([self.__boxes, boxes[unmatched]])
+        self.__velocities = concatenate([self.__velocities, zeros((newCount, 4), dtype=float32)])
+        self.__scores = concatenate([self.__scores, scores[unmatched]])
+        self.__hits = concatenate([self.__hits, zeros(newCount, dtype=int64) + 1])
+        self.__misses = concatenate([self.__misses, zeros(newCount, dtype=int64)])
+        self.__firstSeen = concatenate([self.__firstSeen, zeros(newCount, dtype=float64) + timestamp])
+        self.__dwellCount = concatenate([self.__dwellCount, zeros(newCount, dtype=int64)])
+        self.__confirmed = concatenate([self.__confirmed, zeros(newCount, dtype=bool_)])
+
+        # Track id of every input box, in input order
+        ids = [0] * len(boxes)
+        for track, box in matches:
+            ids[box] = int(self.__ids[track])
+        for box, trackId in zip(unmatched.nonzero()[0], newIds):
+            ids[box] = int(trackId)
+
+        events: List[Dict[str, Any]] = []
+        entered = ~self.__confirmed & (self.__hits >= self.__minHits)
+        self.__confirmed |= entered
+        for index in entered.nonzero()[0]:
+            events.append(self.__event("enter", index, timestamp))
+
+        dwellDue = self.__confirmed & (self.__misses == 0) & (
+            timestamp - self.__firstSeen >= self.__dwellTime * 1000 * (self.__dwellCount + 1)
+        )
+        self.__dwellCount[dwellDue] += 1
+        for index in dwellDue.nonzero()[0]:
+            events.append(self.__event("dwell", index, timestamp))
+
+        expired = self.__misses > self.__maxMisses
+        for index in (expired & self.__confirmed).nonzero()[0]:
+            events.append(self.__event("exit", index, timestamp))
+        if expired.any():
+            keep = ~expired
+            self.__ids = self.__ids[keep]
+            self.__boxes = self.__boxes[keep]
+            self.__velocities = self.__velocities[keep]
+            self.__scores = self.__scores[keep]
+            self.__hits = self.__hits[keep]
+            self.__misses = self.__misses[keep]
+            self.__firstSeen = self.__firstSeen[keep]
+            self.__dwellCount = self.__dwellCount[keep]
+            self.__confirmed = self.__confirmed[keep]
+
+        return ids, events
+
+    def __event(self, type: str, index: int, timestamp: int) -> Dict[str, Any]:
+        x1, y1, x2, y2 = (round(float(value)) for value in self.__boxes[index])
+        return {
+            "type": type,
+            "id": int(self.__ids[index]),
+            "timestamp": timestamp,
+            "duration": int(timestamp - self.__firstSeen[index]),
+            "box": [x1, y1, x2, y2],
+        }
+
+    def getActiveIds(self) -> List[int]:
+        return [int(trackId) for trackId in self.__ids[self.__confirmed & (self.__misses == 0)]]
+
+    def predict(self, timestamp: int) -> Tuple[List[int], ndarray, ndarray]:
+        # Boxes of the tracks seen by the last update, moved along their
+        # velocity. Does not change any state, so frames between two
+        # detections can be predicted in any order
+        visible = self.__misses == 0
+        elapsed = 0 if self.__lastUpdate is None else timestamp - self.__lastUpdate
+        boxes = self.__boxes[visible] + self.__velocities[visible] * elapsed
+        return [int(trackId) for trackId in self.__ids[visible]], boxes, self.__scores[visible]
@@ -1,18 +1,346 @@
-from cv2 import CAP_PROP_FRAME_HEIGHT, CAP_PROP_FRAME_WIDTH, VideoCapture, typing as cvTyping
+from os import environ
+from threading import Condition, Event, Thread
+from time import perf_counter, sleep
+from typing import Any, Callable, Dict, List, Optional, Union
+from urllib.parse import urlsplit, urlunsplit
+from cv2 import (
+    CAP_ANY, CAP_FFMPEG, CAP_GSTREAMER, CAP_PROP_FOURCC, CAP_PROP_FPS, CAP_PROP_FRAME_HEIGHT,
+    CAP_PROP_FRAME_WIDTH, CAP_PROP_HW_ACCELERATION, CAP_PROP_OPEN_TIMEOUT_MSEC, CAP_PROP_POS_FRAMES,
+    CAP_PROP_POS_MSEC, CAP_PROP_READ_TIMEOUT_MSEC, CAP_V4L2, VIDEO_ACCELERATION_ANY, VideoCapture,
+    VideoWriter_fourcc, getBuildInformation, rectangle, typing as cvTyping,
+)
+from numpy import random, uint8
+
+
+V4L2 = "v4l2"
+GSTREAMER = "gstreamer"
+FILE = "file"
+RTSP = "rtsp"
+
+
+def getBackend(spec: str) -> str:
+    # 0, /dev/video0 -> V4L2, gst:<pipeline> -> GStreamer, rtsp://... -> RTSP,
+    # anything else is a video file
+    if spec.startswith("gst:"):
+        return GSTREAMER
+    if spec.lower().startswith(("rtsp://", "rtsps://")):
+        return RTSP
+    if spec.isdigit() or spec.startswith("/dev/video"):
+        return V4L2
+    return FILE
+
+
+def getSourceName(spec: str) -> str:
+    # Safe to log and to use as a label, credentials are removed from URLs
+    if getBackend(spec) != RTSP:
+        return spec
+    parts = urlsplit(spec)
+    netloc = parts.hostname or ""
+    if parts.port is not None:
+        netloc = f"{netloc}:{parts.port}"
+    return urlunsplit((parts.scheme, netloc, parts.path, parts.query, ""))
+
+
+def decodeFourcc(code: int) -> str:
+    return "".join(chr((code >> shift) & 0xFF) for shift in (0, 8, 16, 24)).strip("\0 ")
+
+
+def hasGStreamer() -> bool:
+    for line in getBuildInformation().splitlines():
+        if line.strip().startswith("GStreamer:"):
+            return "YES" in line
+    return False
+
+
+def openV4l2(spec: str, width: int, height: int, fourcc: str, fps: float) -> VideoCapture:
+    capture = VideoCapture(int(spec) if spec.isdigit() else spec, CAP_V4L2)
+    # The format has to be requested before the frame size, the driver only
+    # offers the large MJPG sizes once it is switched to MJPG
+    if fourcc:
+        capture.set(CAP_PROP_FOURCC, VideoWriter_fourcc(*fourcc))
+    capture.set(CAP_PROP_FRAME_WIDTH, width)
+    capture.set(CAP_PROP_FRAME_HEIGHT, height)
+    if fps > 0:
+        capture.set(CAP_PROP_FPS, fps)
+    return capture
+
+
+def openGStreamer(spec: str, width: int, height: int, fourcc: str, fps: float) -> VideoCapture:
+    pipeline = spec[len("gst:"):].strip()
+    if "appsink" not in pipeline:
+        pipeline += " ! videoconvert ! video/x-raw,format=BGR ! appsink drop=true max-buffers=1"
+    return VideoCapture(pipeline, CAP_GSTREAMER)
+
+
+def openRtsp(spec: str, width: int, height: int, fourcc: str, fps: float) -> VideoCapture:
+    if hasGStreamer():
+        # decodebin picks a hardware decoder when one is installed
+        capture = VideoCapture(
+            f"rtspsrc location={spec} latency=100 ! decodebin ! videoconvert ! "
+            "video/x-raw,format=BGR ! appsink drop=true max-buffers=1 sync=false",
+            CAP_GSTREAMER,
+        )
+        if capture.isOpened():
+            return capture
+        capture.release()
+
+    # TCP survives lossy links far better than the UDP default
+    environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", "rtsp_transport;tcp")
+    return VideoCapture(spec, CAP_FFMPEG, [
+        CAP_PROP_HW_ACCELERATION, VIDEO_ACCELERATION_ANY,
+        CAP_PROP_OPEN_TIMEOUT_MSEC, 5000,
+        CAP_PROP_READ_TIMEOUT_MSEC, 5000,
+    ])
+
+
+def openFile(spec: str, width: int, height: int, fourcc: str, fps: float) -> VideoCapture:
+    return VideoCapture(spec, CAP_ANY)
+
+
+OPENERS: Dict[str, Callable[[str, int, int, str, float], VideoCapture]] = {
+    V4L2: openV4l2,
+    GSTREAMER: openGStreamer,
+    RTSP: openRtsp,
+    FILE: openFile,
+}
 
 
 class Video:
 
-    __capture: VideoCapture
+    __spec: str
+    __backend: str
+    __width: int
+    __height: int
+    __fourcc: str
+    __fps: float
+    __realtime: bool
+    __reconnectDelay: float
+    __maxReconnectDelay: float
+    __capture: Optional[VideoCapture]
+    __format: Dict[str, Any]
+    __framePeriod: float
+    __lastTimestamp: float
+    __nextFrame: float
+    __frames: int
+    __dropped: int
+    __reconnects: int
+    __closed: Event
+    __reader: Optional[Thread]
+    __readerCondition: Condition
+    __latest: Optional[cvTyping.MatLike]
+    __readerFailed: bool
+    __generation: int
+
+    def __init__(
+        self,
+        device: Union[int, str],
+        width: int,
+        height: int,
+        fourcc: str = "MJPG",
+        fps: float = 0,
+        realtime: bool = True,
+        reconnectDelay: float = 0.5,
+        maxReconnectDelay: float = 10,
+    ) -> None:
+        self.__spec = str(device)
+        self.__backend = getBackend(self.__spec)
+        self.__width = width
+        self.__height = height
+        self.__fourcc = fourcc
+        self.__fps = fps
+        # Files are played at their own frame rate, like a camera would
+        self.__realtime = realtime
+        self.__reconnectDelay = reconnectDelay
+        self.__maxReconnectDelay = maxReconnectDelay
+        self.__capture = None
+        self.__format = {"backend": self.__backend}
+        self.__framePeriod = 0
+        self.__lastTimestamp = 0
+        self.__nextFrame = 0
+        self.__frames = 0
+        self.__dropped = 0
+        self.__reconnects = 0
+        self.__closed = Event()
+        self.__reader = None
+        self.__readerCondition = Condition()
+        self.__latest = None
+        self.__readerFailed = False
+        self.__generation = 0
+        self.__open()
+
+    def __open(self) -> bool:
+        capture = OPENERS[self.__backend](
+            self.__spec, self.__width, self.__height, self.__fourcc, self.__fps,
+        )
+        if not capture.isOpened():
+            capture.release()
+            return False
+
+        # Report what the device agreed to, not what was asked for
+        fps = capture.get(CAP_PROP_FPS)
+        self.__format = {
+            "backend": self.__backend,
+            "fourcc": decodeFourcc(max(int(capture.get(CAP_PROP_FOURCC)), 0)),
+            "width": int(capture.get(CAP_PROP_FRAME_WIDTH)),
+            "height": int(capture.get(CAP_PROP_FRAME_HEIGHT)),
+            "fps": round(fps, 2) if 0 < fps < 1000 else 0,
+        }
+        self.__framePeriod = 1000 / self.__format["fps"] if self.__format["fps"] > 0 else 0
+        self.__lastTimestamp = 0
+        self.__capture = capture
+
+        # Network streams keep buffering while the detector is busy, a reader
+        # thread keeps only the newest frame so latency cannot build up
+        if self.__backend == RTSP:
+            with self.__readerCondition:
+                self.__generation += 1
+                self.__latest = None
+                self.__readerFailed = False
+            self.__reader = Thread(
+                target=self.__readLoop,
+                args=(capture, self.__generation),
+                name=f"video-{getSourceName(self.__spec)}",
+                daemon=True,
+            )
+            self.__reader.start()
+        return True
+
+    def __release(self) -> None:
+        if self.__reader is not None:
+            # The reader owns its capture and releases it once its read
+            # returns, a read stuck in rtspsrc must not have the capture
+            # released under it
+            with self.__readerCondition:
+                self.__generation += 1
+            self.__reader.join(timeout=self.__maxReconnectDelay)
+            self.__reader = None
+        elif self.__capture is not None:
+            self.__capture.release()
+        self.__capture = None
+
+    def __readLoop(self, capture: VideoCapture, generation: int) -> None:
+        try:
+            while not self.__closed.is_set():
+                ok, frame = capture.read()
+                with self.__readerCondition:
+                    # A reader given up on must not touch the next connection
+                    if generation != self.__generation:
+                        return
+                    if not ok:
+                        self.__readerFailed = True
+                        self.__readerCondition.notify_all()
+                        return
+                    if self.__latest is not None:
+                        self.__dropped += 1
+                    self.__latest = frame
+                    self.__readerCondition.notify_all()
+        finally:
+            capture.release()
+
+    def __read(self) -> Optional[cvTyping.MatLike]:
+        if self.__reader is not None:
+            with self.__readerCondition:
+                self.__readerCondition.wait_for(
+                    lambda: (
+                        self.__latest is not None or self.__readerFailed
+                        or self.__closed.is_set()
+                    ),
+                    timeout=self.__maxReconnectDelay,
+                )
+                frame, self.__latest = self.__latest, None
+            return frame
+
+        ok, frame = self.__capture.read()
+        if not ok and self.__backend == FILE:
+            # End of the file, start over
+            self.__capture.set(CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.__capture.read()
+        if not ok:
+            return None
+
+        if self.__backend == FILE:
+            if self.__realtime and self.__framePeriod > 0:
+                now = perf_counter()
+                if self.__nextFrame > now:
+                    sleep(self.__nextFrame - now)
+                self.__nextFrame = max(self.__nextFrame, now) + self.__framePeriod / 1000
+        elif self.__framePeriod > 0:
+            # Gaps between buffer timestamps are frames the driver or the
+            # pipeline dropped because we were too slow to take them
+            timestamp = self.__capture.get(CAP_PROP_POS_MSEC)
+            if self.__lastTimestamp > 0 and timestamp > self.__lastTimestamp:
+                missed = round((timestamp - self.__lastTimestamp) / self.__framePeriod) - 1
+                self.__dropped += max(missed, 0)
+            self.__lastTimestamp = timestamp
+        return frame
+
+    def capture(self, timeout: Optional[float] = None) -> Optional[cvTyping.MatLike]:
+        # Only returns None once closed, read failures reconnect with
+        # exponential backoff instead of handing empty frames on. With a
+        # timeout it also gives up reconnecting after that many seconds
+        delay = self.__reconnectDelay
+        deadline = None if timeout is None else perf_counter() + timeout
+        while not self.__closed.is_set():
+            if self.__capture is not None:
+                frame = self.__read()
+                if frame is not None:
+                    self.__frames += 1
+                    return frame
+                self.__release()
+            wait = delay if deadline is None else min(delay, deadline - perf_counter())
+            if wait <= 0 or self.__closed.wait(wait):
+                break
+            delay = min(delay * 2, self.__maxReconnectDelay)
+            if self.__open():
+                self.__reconnects += 1
+        return None
+
+    def isOpened(self) -> bool:
+        return self.__capture is not None
+
+    def getStats(self) -> Dict[str, Any]:
+        return {
+            **self.__format,
+            "frames": self.__frames,
+            "dropped": self.__dropped,
+            "reconnects": self.__reconnects,
+        }
+
+    def close(self) -> None:
+        self.__closed.set()
+        with self.__readerCondition:
+            self.__readerCondition.notify_all()
+        self.__release()
+
+
+class SyntheticVideo:
 
-    def __init__(self, device: int, width: int, height: int) -> None:
-        self.__capture = VideoCapture(device)
-        self.__capture.set(CAP_PROP_FRAME_WIDTH, width)
-        self.__capture.set(CAP_PROP_FRAME_HEIGHT, height)
+    __frames: List[Any]
+    __index: int
 
-    def capture(self) -> cvTyping.MatLike:
-        _, frame = self.__capture.read()
+    def __init__(self, width: int, height: int, count: int = 60, seed: int = 0) -> None:
+        # Pre-rendered noise with a few moving blocks, generating frames on
+        # the fly would show up as capture time
+        generator = random.default_rng(seed)
+        background = generator.integers(0, 255, (height, width, 3), dtype=uint8)
+        self.__frames = []
+        for index in range(count):
+            frame = background.copy()
+            for block in range(3):
+                x = (index * (5 + block * 3) + block * width // 3) % max(1, width - width // 8)
+                y = height // 4 + block * height // 8
+                rectangle(frame, (x, y), (x + width // 8, y + height // 3), (255, 255, 255), -1)
+            self.__frames.append(frame)
+        self.__index = 0
+
+    def capture(self) -> Any:
+        # Monitor draws on the frame, hand out a copy like a camera would
+        frame = self.__frames[self.__index].copy()
+        self.__index = (self.__index + 1) % len(self.__frames)
         return frame
 
+    def getStats(self) -> Dict[str, Any]:
+        return {"backend": "synthetic", "dropped": 0, "reconnects": 0}
+
     def close(self) -> None:
-        self.__capture.release()
+        self.__frames = []
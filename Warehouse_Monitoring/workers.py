@@ -0,0 +1,269 @@
+from itertools import count
+from logging import Logger
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from queue import Queue
+from threading import Condition, Lock, Thread
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from cv2 import rectangle
+from mediapipe.tasks.python.components.containers import BoundingBox, Category, Detection
+from numpy import copyto, float32, ndarray, uint8, zeros
+from detections import DetectionBatch
+from overlay import TextOverlay
+
+
+# Seconds a frame may wait for its worker before it is given up
+INFERENCE_TIMEOUT = 30
+
+
+def runWorker(
+    modelPath: str,
+    scoreThreshold: float,
+    tasks: Any,
+    results: Any,
+    current: Any,
+) -> None:
+    # Import here so the parent process never loads the model itself
+    from detector import Detector
+
+    detector = Detector(modelPath, scoreThreshold)
+    slots: Dict[int, SharedMemory] = {}
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        ticket, slotIndex, slotName, shape = task
+
+        # Attach to the slot once, re-attach only if the parent had to grow it
+        slot = slots.get(slotIndex)
+        if slot is None or slot.name != slotName:
+            if slot is not None:
+                slot.close()
+            slot = SharedMemory(name=slotName)
+            slots[slotIndex] = slot
+        frame = ndarray(shape, dtype=uint8, buffer=slot.buf)
+
+        # Tells the parent which ticket is lost if this process dies
+        current.value = ticket
+        try:
+            detections = detector.getDetections(frame)
+        except Exception as error:
+            current.value = -1
+            results.put((ticket, None, [], repr(error)))
+            continue
+        current.value = -1
+
+        # Ship back a compact array instead of pickling MediaPipe objects
+        boxes = zeros((len(detections), 6), dtype=float32)
+        names: List[str] = []
+        for row, detection in enumerate(detections):
+            box = detection.bounding_box
+            category = detection.categories[0]
+            boxes[row] = (
+                box.origin_x, box.origin_y, box.width, box.height,
+                category.score, category.index if category.index is not None else -1,
+            )
+            names.append(category.category_name)
+        results.put((ticket, boxes, names, None))
+
+    for slot in slots.values():
+        slot.close()
+    detector.close()
+
+
+class ProcessDetector:
+
+    __modelPath: str
+    __scoreThreshold: float
+    __context: Any
+    __tasks: Any
+    __results: Any
+    __processes: List[Any]
+    __current: List[Any]
+    __processLock: Lock
+    __restarts: int
+    __failures: int
+    __logger: Optional[Logger]
+    __slots: List[Optional[SharedMemory]]
+    __freeSlots: "Queue[int]"
+    __tickets: Iterator[int]
+    __finished: Dict[int, Tuple[Any, List[str], Optional[str]]]
+    __pending: Set[int]
+    __condition: Condition
+    __collector: Thread
+    __overlay: TextOverlay
+
+    def __init__(
+        self,
+        modelPath: str,
+        scoreThreshold: float,
+        workers: int,
+        logger: Optional[Logger] = None,
+    ) -> None:
+        self.__modelPath = modelPath
+        self.__scoreThreshold = scoreThreshold
+        self.__context = get_context("spawn")
+        self.__tasks = self.__context.Queue()
+        self.__results = self.__context.Queue()
+        self.__current = [self.__context.RawValue("q", -1) for _ in range(max(1, workers))]
+        self.__processes = [self.__startWorker(index) for index in range(len(self.__current))]
+        self.__processLock = Lock()
+        self.__restarts = 0
+        self.__failures = 0
+        self.__logger = logger
+
+        # Two frame slots per worker, one being inferred and one being filled
+        self.__slots = [None] * (2 * len(self.__processes))
+        self.__freeSlots = Queue()
+        for index in range(len(self.__slots)):
+            self.__freeSlots.put(index)
+
+        self.__tickets = count()
+        self.__finished = {}
+        self.__pending = set()
+        self.__condition = Condition()
+        self.__collector = Thread(target=self.__collect, name="detector-results", daemon=True)
+        self.__collector.start()
+        self.__overlay = TextOverlay()
+
+    def __startWorker(self, index: int) -> Any:
+        self.__current[index].value = -1
+        process = self.__context.Process(
+            target=runWorker,
+            args=(
+                self.__modelPath, self.__scoreThreshold,
+                self.__tasks, self.__results, self.__current[index],
+            ),
+            name=f"detector-{index}",
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def __restartWorkers(self) -> None:
+        # A dead worker is replaced, the frame it was inferring is given up
+        with self.__processLock:
+            for index, process in enumerate(self.__processes):
+                if process.is_alive():
+                    continue
+                ticket = self.__current[index].value
+                if ticket >= 0:
+                    with self.__condition:
+                        if ticket in self.__pending:
+                            self.__finished[ticket] = (None, [], "inference worker process exited")
+                        self.__condition.notify_all()
+                if self.__logger is not None:
+                    self.__logger.warning(
+                        f"inference worker {process.name} exited with code {process.exitcode}, restarting"
+                    )
+                self.__processes[index] = self.__startWorker(index)
+                self.__restarts += 1
+
+    def __collect(self) -> None:
+        while True:
+            result = self.__results.get()
+            if result is None:
+                break
+            ticket, boxes, names, error = result
+            with self.__condition:
+                # Late results of given up tickets are dropped
+                if ticket in self.__pending:
+                    self.__finished[ticket] = (boxes, names, error)
+                self.__condition.notify_all()
+
+    def __getSlot(self, index: int, size: int) -> SharedMemory:
+        slot = self.__slots[index]
+        if slot is None or slot.size < size:
+            if slot is not None:
+                slot.close()
+                slot.unlink()
+            slot = SharedMemory(create=True, size=size)
+            self.__slots[index] = slot
+        return slot
+
+    def __infer(self, frame: Any) -> Tuple[ndarray, List[str]]:
+        slotIndex = self.__freeSlots.get()
+        try:
+            slot = self.__getSlot(slotIndex, frame.nbytes)
+            copyto(ndarray(frame.shape, dtype=uint8, buffer=slot.buf), frame)
+
+            ticket = next(self.__tickets)
+            with self.__condition:
+                self.__pending.add(ticket)
+            self.__tasks.put((ticket, slotIndex, slot.name, frame.shape))
+            deadline = perf_counter() + INFERENCE_TIMEOUT
+            while True:
+                with self.__condition:
+                    self.__condition.wait_for(lambda: ticket in self.__finished, timeout=1)
+                    if ticket in self.__finished:
+                        self.__pending.discard(ticket)
+                        boxes, names, error = self.__finished.pop(ticket)
+                        break
+                    # Lost without a trace, e.g. the worker died right
+                    # after taking it from the queue
+                    if perf_counter() > deadline:
+                        self.__pending.discard(ticket)
+                        boxes, names, error = None, [], "no result from worker process"
+                        break
+                self.__restartWorkers()
+        finally:
+            self.__freeSlots.put(slotIndex)
+
+        # One failed frame has no detections, the next one is tried again
+        if error is not None:
+            self.__failures += 1
+            if self.__logger is not None:
+                self.__logger.warning(f"inference failed in worker process: {error}")
+            return zeros((0, 6), dtype=float32), []
+        return boxes, names
+
+    def getDetectionBatch(self, frame: Any) -> DetectionBatch:
+        # Straight from the arrays the worker sent, no MediaPipe objects
+        boxes, names = self.__infer(frame)
+        corners = boxes[:, :4].copy()
+        corners[:, 2:] += corners[:, :2]
+        return DetectionBatch.fromNames(corners, boxes[:, 4], names)
+
+    def getDetections(self, frame: Any) -> Any:
+        boxes, names = self.__infer(frame)
+        return [
+            Detection(
+                bounding_box=BoundingBox(int(x), int(y), int(width), int(height)),
+                categories=[Category(
+                    index=int(index) if index >= 0 else None,
+                    score=float(score),
+                    category_name=name,
+                )],
+            )
+            for (x, y, width, height, score, index), name in zip(boxes.tolist(), names)
+        ]
+
+    def markDetection(
+        self,
+        image: Any,
+        bounds: tuple[int, int, int, int],
+    ) -> Any:
+        x1, y1, x2, y2 = bounds
+        rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 1)
+        return image
+
+    def setCustomText(self, image: Any, position: Tuple[int, int], text: str) -> Any:
+        return self.__overlay.draw(image, position, text)
+
+    def getSize(self) -> int:
+        return len(self.__processes)
+
+    def getStats(self) -> Dict[str, int]:
+        return {"restarts": self.__restarts, "failures": self.__failures}
+
+    def close(self) -> None:
+        for _ in self.__processes:
+            self.__tasks.put(None)
+        for process in self.__processes:
+            process.join(timeout=2)
+        self.__results.put(None)
+        for slot in self.__slots:
+            if slot is not None:
+                slot.close()
+                slot.unlink()
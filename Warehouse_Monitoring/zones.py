@@ -0,0 +1,137 @@
+from concurrent.futures import ThreadPoolExecutor
+from json import load
+from typing import Any, List, Optional, Tuple
+from cv2 import INTER_AREA, pointPolygonTest, polylines, resize
+from numpy import array, int32, ndarray
+from detections import DetectionBatch
+
+
+class Zone:
+
+    __id: str
+    __polygon: ndarray
+    __bounds: Tuple[int, int, int, int]
+
+    def __init__(self, id: str, points: List[Tuple[int, int]]) -> None:
+        self.__id = id
+        self.__polygon = array(points, dtype=int32).reshape(-1, 1, 2)
+        xs, ys = self.__polygon[:, 0, 0], self.__polygon[:, 0, 1]
+        self.__bounds = (int(xs.min()), int(ys.min()), int(xs.max()), int(ys.max()))
+
+    def getId(self) -> str:
+        return self.__id
+
+    def getBounds(self) -> Tuple[int, int, int, int]:
+        return self.__bounds
+
+    def getPolygon(self) -> ndarray:
+        return self.__polygon
+
+    def contains(self, x: float, y: float) -> bool:
+        return pointPolygonTest(self.__polygon, (float(x), float(y)), False) >= 0
+
+
+def loadZones(path: str) -> List[Zone]:
+    # {"zones": [{"id": "door", "rect": [x1, y1, x2, y2]},
+    #            {"id": "aisle", "polygon": [[x, y], [x, y], [x, y]]}]}
+    with open(path, "r") as file:
+        config = load(file)
+
+    zones: List[Zone] = []
+    for index, zone in enumerate(config.get("zones", [])):
+        zoneId = str(zone.get("id", index))
+        if "rect" in zone:
+            x1, y1, x2, y2 = zone["rect"]
+            zones.append(Zone(zoneId, [(x1, y1), (x2, y1), (x2, y2), (x1, y2)]))
+        elif "polygon" in zone and len(zone["polygon"]) >= 3:
+            zones.append(Zone(zoneId, [tuple(point) for point in zone["polygon"]]))
+        else:
+            raise ValueError(f"zone {zoneId} needs a rect or a polygon with at least 3 points")
+    return zones
+
+
+def mergeBounds(bounds: List[Tuple[int, int, int, int]]) -> List[Tuple[int, int, int, int]]:
+    # Overlapping crops are merged so no pixel goes through the model twice
+    merged = list(bounds)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                a, b = merged[i], merged[j]
+                if a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]:
+                    merged[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    del merged[j]
+                    changed = True
+                    break
+            if changed:
+                break
+    return merged
+
+
+class ZoneDetector:
+
+    __detector: Any
+    __zones: List[Zone]
+    __maxSize: int
+    __executor: Optional[ThreadPoolExecutor]
+
+    def __init__(self, detector: Any, zones: List[Zone], maxSize: int) -> None:
+        self.__detector = detector
+        self.__zones = zones
+        self.__maxSize = maxSize
+        # Crops are dispatched together when there is more than one detector
+        # to run them on
+        self.__executor = (
+            ThreadPoolExecutor(max_workers=detector.getSize(), thread_name_prefix="zone")
+            if detector.getSize() > 1 else None
+        )
+
+    def getZones(self) -> List[Zone]:
+        return self.__zones
+
+    def __detectCrop(self, frame: Any, bounds: Tuple[int, int, int, int]) -> DetectionBatch:
+        x1, y1, x2, y2 = bounds
+        crop = frame[y1:y2, x1:x2]
+        height, width = crop.shape[:2]
+        scale = 1.0
+        if self.__maxSize > 0 and max(width, height) > self.__maxSize:
+            scale = self.__maxSize / max(width, height)
+            crop = resize(
+                crop,
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                interpolation=INTER_AREA,
+            )
+
+        # Map boxes back to full frame coordinates
+        return self.__detector.getDetectionBatch(crop).scale(1 / scale, 1 / scale).translate(x1, y1)
+
+    def getDetectionBatch(self, frame: Any) -> DetectionBatch:
+        frameHeight, frameWidth = frame.shape[:2]
+        crops = mergeBounds([
+            (max(x1, 0), max(y1, 0), min(x2, frameWidth), min(y2, frameHeight))
+            for x1, y1, x2, y2 in (zone.getBounds() for zone in self.__zones)
+        ])
+        crops = [crop for crop in crops if crop[2] > crop[0] and crop[3] > crop[1]]
+
+        if self.__executor is not None and len(crops) > 1:
+            results = list(self.__executor.map(lambda crop: self.__detectCrop(frame, crop), crops))
+        else:
+            results = [self.__detectCrop(frame, crop) for crop in crops]
+        return DetectionBatch.concatenate(results)
+
+    def getZone(self, bounds: Tuple[int, int, int, int]) -> Optional[str]:
+        # A detection belongs to the first zone that contains its centre
+        x1, y1, x2, y2 = bounds
+        for zone in self.__zones:
+            if zone.contains((x1 + x2) / 2, (y1 + y2) / 2):
+                return zone.getId()
+        return None
+
+    def markZones(self, image: Any) -> Any:
+        polylines(image, [zone.getPolygon() for zone in self.__zones], True, (255, 128, 0), 1)
+        return image
+
+    def close(self) -> None:
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False)